@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Offline stand-in for ffmpeg/ffprobe used by the benchmarks. The first
+# argument selects the tool ("ffmpeg" or "ffprobe"); the rest are the usual
+# command line. ffprobe reports one AAC stream; ffmpeg prints "-progress"
+# output over UD_BENCH_FFMPEG_TIME seconds, then copies the first input to the
+# output (only the first eighth of it when extracting audio with -vn).
+
+import sys
+import os
+import json
+import time
+
+DURATION = 634.0
+STEPS = 20
+
+def ffprobe(args):
+    if "json" not in args:
+        print("0")
+        return 0
+    print(json.dumps({"streams": [{"codec_name": "aac"}], "format": {"duration": str(DURATION)}}))
+    return 0
+
+def ffmpeg(args):
+    if "-version" in args:
+        print("ffmpeg version 7.0-bench")
+        return 0
+    source = args[args.index("-i") + 1]
+    target = args[-1]
+    seconds = float(os.environ.get("UD_BENCH_FFMPEG_TIME") or 0.2)
+    for step in range(1, STEPS + 1):
+        time.sleep(seconds / STEPS)
+        print(f"out_time_us={int(DURATION * 1000000 * step / STEPS)}", flush=True)
+        print("progress=continue" if step < STEPS else "progress=end", flush=True)
+    with open(source, "rb") as f:
+        data = f.read()
+    with open(target, "wb") as f:
+        f.write(data[:len(data) // 8] if "-vn" in args else data)
+    return 0
+
+if __name__ == '__main__':
+    tool, args = sys.argv[1], sys.argv[2:]
+    sys.exit(ffprobe(args) if tool == "ffprobe" else ffmpeg(args))
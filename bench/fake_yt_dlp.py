@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Offline stand-in for yt-dlp used by the benchmarks. It replays the recorded
+# metadata in fixtures/video.json and prints download progress in the format
+# requested with --progress-template, at the speed set through UD_BENCH_SPEED.
+#
+# Knobs (environment):
+#   UD_BENCH_SIZE      bytes per downloaded video (default 1 MiB)
+#   UD_BENCH_SPEED     bytes per second, 0 for unthrottled (default 0)
+#   UD_BENCH_CHUNK     bytes per progress line (default 64 KiB)
+#   UD_BENCH_PROBE     seconds spent "extracting" before the download starts
+#   UD_BENCH_MERGE     seconds spent merging video and audio
+#   UD_BENCH_MEDIA     base URL of bench/media_server.py; without it bytes are generated locally
+#
+# URLs may carry fail=429|503|404 to simulate failures, and playlists are
+# ".../playlist?list=BENCH<count>".
+
+import sys
+import os
+import re
+import time
+import zlib
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "video.json")
+VALUE_OPTIONS = {
+    "-o", "-f", "--progress-template", "--limit-rate", "--download-archive", "--merge-output-format",
+    "--cookies-from-browser", "--cookies", "--concurrent-fragments", "--downloader", "--downloader-args",
+    "--dateafter", "--datebefore",
+}
+FAILURES = {
+    "429": "ERROR: unable to download video data: HTTP Error 429: Too Many Requests",
+    "503": "ERROR: unable to download video data: HTTP Error 503: Service Unavailable",
+    "404": "ERROR: [youtube] {id}: Video unavailable. This video has been removed by the uploader",
+}
+BLOCK = bytes(range(256)) * 256
+
+def env_number(name, default):
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+def parse_args(argv):
+    options, flags, urls = {}, set(), []
+    index = 0
+    while index < len(argv):
+        arg = argv[index]
+        if arg == "--":
+            urls += argv[index + 1:]
+            break
+        if arg in VALUE_OPTIONS:
+            options[arg] = argv[index + 1]
+            index += 2
+            continue
+        if arg.startswith("-"):
+            flags.add(arg)
+        else:
+            urls.append(arg)
+        index += 1
+    return options, flags, urls
+
+def video_id(url):
+    match = re.search(r'(?:v=|youtu\.be/|/)([0-9A-Za-z_-]{11})(?:[&?#]|$)', url)
+    return match.group(1) if match else f"{zlib.crc32(url.encode()):011d}"
+
+def query_value(url, key):
+    match = re.search(rf'[?&]{key}=([^&#]+)', url)
+    return match.group(1) if match else None
+
+def load_info(url):
+    import json
+    with open(FIXTURE, encoding='utf-8') as f:
+        info = json.load(f)
+    vid = video_id(url)
+    info.update(id=vid, title=f"Bench {vid}", fulltitle=f"Bench {vid}", webpage_url=url)
+    return info
+
+def print_info(url):
+    import json
+    print(json.dumps(load_info(url)), flush=True)
+
+def print_formats(url):
+    info = load_info(url)
+    print(f"[info] Available formats for {info['id']}:")
+    print("ID      EXT   RESOLUTION FPS | FILESIZE   TBR PROTO | VCODEC          ACODEC")
+    print("-" * 80)
+    for fmt in info['formats']:
+        size = fmt.get('filesize') or fmt.get('filesize_approx') or 0
+        print(
+            f"{fmt['format_id']:<7} {fmt['ext']:<5} {fmt.get('resolution', ''):<10} {str(fmt.get('fps') or ''):<3} | "
+            f"{size / 1024 ** 2:8.2f}MiB {fmt.get('tbr') or 0:5.0f}k {fmt['protocol']:<5} | "
+            f"{fmt['vcodec']:<15} {fmt['acodec']}"
+        )
+
+def print_playlist(url):
+    import json
+    match = re.search(r'list=BENCH(\d+)', url)
+    if not match:
+        print(f"ERROR: [youtube:tab] {url}: This playlist does not exist", flush=True)
+        return 1
+    for position in range(1, int(match.group(1)) + 1):
+        vid = f"bench{position:06d}"
+        print(json.dumps({
+            "_type": "url", "ie_key": "Youtube", "id": vid, "url": f"https://www.youtube.com/watch?v={vid}",
+            "title": f"Bench {vid}", "duration": 60 + position % 600, "upload_date": "20240115",
+        }), flush=True)
+    return 0
+
+def render_progress(template, values):
+    template = template.split(":", 1)[1] if template.startswith("download:") else template
+    return re.sub(r'%\(progress\.(\w+)\)s', lambda m: str(values.get(m.group(1), "NA")), template)
+
+def open_source(name, size, kind="media"):
+    base = os.environ.get("UD_BENCH_MEDIA")
+    if not base:
+        return None
+    from urllib.parse import quote
+    from urllib.request import urlopen
+    return urlopen(f"{base.rstrip('/')}/{kind}/{quote(name)}?size={size}")
+
+def write_thumbnail(path):
+    thumbnail = os.path.splitext(path)[0] + ".png"
+    print(f"[info] Writing video thumbnail original to: {thumbnail}", flush=True)
+    source = open_source(os.path.basename(thumbnail), 0, "thumb")
+    with open(thumbnail, "wb") as f:
+        f.write(source.read() if source else b"\x89PNG\r\n\x1a\n")
+    if source:
+        source.close()
+
+def download_file(path, size, options):
+    template = options.get("--progress-template")
+    speed = env_number("UD_BENCH_SPEED", 0)
+    if options.get("--limit-rate"):
+        limit = float(options["--limit-rate"])
+        speed = min(speed, limit) if speed else limit
+    chunk = int(env_number("UD_BENCH_CHUNK", 64 * 1024))
+    print(f"[download] Destination: {path}", flush=True)
+    source = open_source(os.path.basename(path), size)
+    started = time.monotonic()
+    downloaded = 0
+    with open(path + ".part", "wb") as f:
+        while downloaded < size:
+            length = min(chunk, size - downloaded)
+            data = source.read(length) if source else BLOCK[:length]
+            if not data:
+                raise OSError("Remote end closed connection without response")
+            f.write(data)
+            downloaded += len(data)
+            elapsed = time.monotonic() - started
+            if speed and downloaded / speed > elapsed:
+                time.sleep(downloaded / speed - elapsed)
+                elapsed = time.monotonic() - started
+            current = downloaded / elapsed if elapsed else None
+            eta = int((size - downloaded) / current) if current else None
+            values = {"downloaded_bytes": downloaded, "total_bytes": size, "speed": current, "eta": eta}
+            if template:
+                print(render_progress(template, values), flush=True)
+            else:
+                print(f"[download] {downloaded * 100 / size:5.1f}% of {size} at {current or 0:.0f}B/s", flush=True)
+    if source:
+        source.close()
+    os.replace(path + ".part", path)
+
+def download(url, options, flags):
+    vid = video_id(url)
+    print(f"[youtube] Extracting URL: {url}", flush=True)
+    print(f"[youtube] {vid}: Downloading webpage", flush=True)
+    time.sleep(env_number("UD_BENCH_PROBE", 0))
+    failure = query_value(url, "fail")
+    if failure:
+        print(FAILURES.get(failure, FAILURES["503"]).format(id=vid), flush=True)
+        return 1
+
+    upload_date = load_info(url).get('upload_date')
+    after, before = options.get("--dateafter"), options.get("--datebefore")
+    if upload_date and ((after and upload_date < after) or (before and upload_date > before)):
+        print(f"[download] Bench {vid} upload date is not in range {after or '-'} - {before or '-'}", flush=True)
+        return 0
+
+    archive = options.get("--download-archive")
+    if archive and os.path.exists(archive):
+        with open(archive, encoding='utf-8') as f:
+            if f"youtube {vid}\n" in f:
+                print(f"[download] {vid}: has already been recorded in the archive", flush=True)
+                return 0
+
+    format_spec = options.get("-f", "best")
+    ext = options.get("--merge-output-format") or "mp4"
+    output = options.get("-o", "%(title)s.%(ext)s")
+    path = output.replace("%(title)s", f"Bench {vid}").replace("%(id)s", vid).replace("%(ext)s", ext)
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        print(f"[download] {path} has already been downloaded", flush=True)
+        return 0
+
+    size = int(env_number("UD_BENCH_SIZE", 1024 * 1024))
+    print(f"[info] {vid}: Downloading 1 format(s): {format_spec}", flush=True)
+    try:
+        if "--write-thumbnail" in flags:
+            write_thumbnail(path)
+        if "+" in format_spec:
+            stem = os.path.splitext(path)[0]
+            parts = [(f"{stem}.f399.{ext}", size - size // 8), (f"{stem}.f251.webm", size // 8)]
+            for part, part_size in parts:
+                download_file(part, part_size, options)
+            print(f'[Merger] Merging formats into "{path}"', flush=True)
+            time.sleep(env_number("UD_BENCH_MERGE", 0))
+            with open(path, "wb") as merged:
+                for part, _ in parts:
+                    with open(part, "rb") as f:
+                        merged.write(f.read())
+                    os.remove(part)
+        else:
+            download_file(path, size, options)
+    except OSError as e:
+        print(f"ERROR: unable to download video data: {e}", flush=True)
+        return 1
+
+    if archive:
+        with open(archive, "a", encoding='utf-8') as f:
+            f.write(f"youtube {vid}\n")
+    return 0
+
+def main(argv):
+    options, flags, urls = parse_args(argv)
+    if "--version" in flags:
+        print("2024.12.13")
+        return 0
+    if not urls:
+        print("ERROR: You must provide at least one URL.", flush=True)
+        return 2
+    url = urls[0]
+    if "--flat-playlist" in flags:
+        return print_playlist(url)
+    if "-J" in flags:
+        print_info(url)
+        return 0
+    if "-F" in flags:
+        print_formats(url)
+        return 0
+    return download(url, options, flags)
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
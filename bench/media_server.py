@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Local HTTP stand-in for the video CDN used by the benchmarks:
+#   /media/<name>?size=<bytes>   synthetic media of the requested size (Range supported)
+#   /thumb/<id>.png              a small generated thumbnail
+
+import sys
+import re
+import zlib
+import struct
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BLOCK = bytes(range(256)) * 256
+DEFAULT_SIZE = 1024 * 1024
+RANGE_RE = re.compile(r'bytes=(\d+)-(\d*)')
+
+def make_png(width=320, height=180):
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    row = b"\x00" + b"".join(bytes((x * 255 // width, 64, 160)) for x in range(width))
+    pixels = row * height
+    return (
+        b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)) +
+        chunk(b"IDAT", zlib.compress(pixels)) + chunk(b"IEND", b"")
+    )
+
+THUMBNAIL = make_png()
+
+class MediaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.startswith("/thumb/"):
+            self.send_body(200, THUMBNAIL, "image/png")
+        elif url.path.startswith("/media/"):
+            size = int(parse_qs(url.query).get("size", [DEFAULT_SIZE])[0])
+            self.send_media(size)
+        else:
+            self.send_body(404, b"not found", "text/plain")
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_media(self, size):
+        start, end = 0, size - 1
+        match = RANGE_RE.match(self.headers.get("Range") or "")
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), end) if match.group(2) else end
+        if start > end:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(206 if match else 200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if match:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        position = start
+        while position <= end:
+            offset = position % len(BLOCK)
+            length = min(len(BLOCK) - offset, end - position + 1)
+            self.wfile.write(BLOCK[offset:offset + length])
+            position += length
+
+class MediaServer:
+    def __init__(self, host="127.0.0.1", port=0):
+        self.server = ThreadingHTTPServer((host, port), MediaHandler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve synthetic media and thumbnails for the benchmarks.")
+    parser.add_argument("--port", type=int, default=8770)
+    args = parser.parse_args(argv)
+    server = MediaServer(port=args.port)
+    print(f"serving on {server.url}", file=sys.stderr)
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Offline benchmarks for the download core. Everything runs against the fake
+# yt-dlp/ffmpeg in this folder and a local media server, so results depend on
+# the code and the machine only. Each run is appended to results.jsonl keyed by
+# the current commit and compared with the previous run.
+#
+#   python bench/run_bench.py                      # all scenarios
+#   python bench/run_bench.py formats memory       # selected scenarios
+#   python bench/run_bench.py --queue-items 200    # quicker memory run
+
+import sys
+import os
+import json
+import time
+import argparse
+import platform
+import tempfile
+import shutil
+import subprocess
+import threading
+import datetime
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+FIXTURE = os.path.join(BENCH_DIR, "fixtures", "video.json")
+DEFAULT_RESULTS = os.path.join(BENCH_DIR, "results.jsonl")
+MiB = 1024 * 1024
+
+def install_fakes(folder):
+    bin_dir = os.path.join(folder, "bin")
+    os.makedirs(bin_dir)
+    tools = {
+        "yt-dlp": [os.path.join(BENCH_DIR, "fake_yt_dlp.py")],
+        "ffmpeg": [os.path.join(BENCH_DIR, "fake_ffmpeg.py"), "ffmpeg"],
+        "ffprobe": [os.path.join(BENCH_DIR, "fake_ffmpeg.py"), "ffprobe"],
+    }
+    paths = {}
+    for name, command in tools.items():
+        quoted = " ".join(f'"{part}"' for part in (sys.executable, *command))
+        if sys.platform == "win32":
+            path = os.path.join(bin_dir, f"{name}.cmd")
+            script = f"@{quoted} %*\r\n"
+        else:
+            path = os.path.join(bin_dir, name)
+            script = f'#!/bin/sh\nexec {quoted} "$@"\n'
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(script)
+        os.chmod(path, 0o755)
+        paths[name] = path
+    return bin_dir, paths
+
+def prepare_environment(workdir):
+    bin_dir, paths = install_fakes(workdir)
+    os.environ["UD_YTDLP"] = paths["yt-dlp"]
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+    for name in ("XDG_DATA_HOME", "XDG_CACHE_HOME", "APPDATA", "LOCALAPPDATA"):
+        os.environ[name] = os.path.join(workdir, "home")
+    sys.path.insert(0, REPO_DIR)
+
+def set_fake_options(size, speed=0, chunk=64 * 1024, probe=0, merge=0):
+    os.environ.update(
+        UD_BENCH_SIZE=str(size), UD_BENCH_SPEED=str(speed), UD_BENCH_CHUNK=str(chunk),
+        UD_BENCH_PROBE=str(probe), UD_BENCH_MERGE=str(merge),
+    )
+
+def git_state():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_DIR, capture_output=True, text=True
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit, dirty
+
+def best_time(function, iterations, rounds=3):
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            function()
+        elapsed = (time.perf_counter() - started) / iterations
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+class SignalCounter:
+    def __init__(self):
+        self.counts = {"item_changed": 0, "progress": 0, "throughput": 0, "message": 0}
+        self.lock = threading.Lock()
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def callbacks(self):
+        return {
+            'on_item_changed': lambda index: self.count("item_changed"),
+            'on_progress': lambda value: self.count("progress"),
+            'on_throughput': lambda value: self.count("throughput"),
+            'on_message': lambda index, text: self.count("message"),
+        }
+
+def make_scheduler(core, folder, workers, index=None, callbacks=None, write_thumbnail=False):
+    output_template = os.path.join(folder, "videos", "%(title)s.%(ext)s")
+    archive = os.path.join(folder, "archive.txt")
+
+    def build(item):
+        return core.DownloadJob(item.url, item.format_spec or core.DEFAULT_FORMAT, output_template,
+                                download_archive=archive, write_thumbnail=write_thumbnail)
+    return core.DownloadScheduler(build, workers, core.ENGINE_SUBPROCESS, index=index, **(callbacks or {}))
+
+def wait_for(scheduler):
+    while not scheduler.wait(0.2):
+        pass
+
+def bench_formats(core, args, workdir):
+    with open(FIXTURE, encoding="utf-8") as f:
+        text = f.read()
+    info = json.loads(text)
+    iterations = args.parse_iterations
+    return {
+        "json_load_us": best_time(lambda: json.loads(text), iterations) * 1e6,
+        "parse_video_formats_us": best_time(lambda: core.parse_video_formats(info), iterations) * 1e6,
+        "render_formats_table_us": best_time(lambda: core.render_formats_table(info), iterations) * 1e6,
+        "quality_choices_us": best_time(lambda: core.quality_choices(info), iterations) * 1e6,
+        "formats": len(info["formats"]),
+    }
+
+def bench_throughput(core, args, workdir):
+    set_fake_options(args.size)
+    urls = [f"https://www.youtube.com/watch?v=thru{position:07d}" for position in range(args.items)]
+    scheduler = make_scheduler(core, os.path.join(workdir, "throughput"), args.workers)
+    started = time.perf_counter()
+    scheduler.start(urls)
+    wait_for(scheduler)
+    elapsed = time.perf_counter() - started
+    jobs, summary = scheduler.report()
+    return {
+        "items": args.items,
+        "workers": args.workers,
+        "failed": summary["failed"],
+        "seconds": elapsed,
+        "items_per_s": summary["done"] / elapsed,
+        "mib_per_s": summary["bytes"] / MiB / elapsed,
+        "mean_probe_s": summary["phase_seconds"]["probe"] / len(jobs),
+        "mean_download_s": summary["phase_seconds"]["download"] / len(jobs),
+    }
+
+def bench_signals(core, args, workdir):
+    set_fake_options(args.signal_size, speed=args.signal_speed, chunk=16 * 1024)
+    counter = SignalCounter()
+    log = core.LogBuffer(os.path.join(workdir, "signals.log"))
+    callbacks = counter.callbacks()
+    count_message = callbacks['on_message']
+
+    def on_message(index, text):
+        count_message(index, text)
+        log.append(text)
+    callbacks['on_message'] = on_message
+
+    flushes = []
+    stop = threading.Event()
+
+    def drain():
+        while not stop.wait(0.1):
+            lines, dropped = log.drain()
+            flushes.append(len(lines))
+    drainer = threading.Thread(target=drain, daemon=True)
+
+    urls = [f"https://www.youtube.com/watch?v=sig{position:08d}" for position in range(args.signal_items)]
+    scheduler = make_scheduler(core, os.path.join(workdir, "signals"), args.workers, callbacks=callbacks)
+    drainer.start()
+    started = time.perf_counter()
+    scheduler.start(urls)
+    wait_for(scheduler)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    drainer.join()
+    log.close()
+    counts = counter.counts
+    ui_signals = counts["item_changed"] + counts["progress"] + counts["throughput"]
+    return {
+        "seconds": elapsed,
+        "ui_signals_per_s": ui_signals / elapsed,
+        "item_changed_per_s": counts["item_changed"] / elapsed,
+        "progress_per_s": counts["progress"] / elapsed,
+        "throughput_per_s": counts["throughput"] / elapsed,
+        "log_lines_per_s": counts["message"] / elapsed,
+        "max_lines_per_flush": max(flushes, default=0),
+    }
+
+def bench_memory(core, args, workdir):
+    set_fake_options(args.memory_size)
+    folder = os.path.join(workdir, "memory")
+    index = core.DownloadIndex(os.path.join(folder, "index.sqlite3"))
+    playlist = f"https://www.youtube.com/playlist?list=BENCH{args.queue_items}"
+
+    def run():
+        scheduler = make_scheduler(core, folder, args.memory_workers, index=index)
+        expander = core.CollectionExpander(scheduler, "None", core.PlaylistFilter())
+        started = time.perf_counter()
+        scheduler.hold()
+        scheduler.start([])
+        expander.start([playlist])
+        scheduler.release()
+        wait_for(scheduler)
+        return scheduler, expander, time.perf_counter() - started
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    scheduler, expander, elapsed = run()
+    counts = scheduler.counts()
+    after_run, peak = tracemalloc.get_traced_memory()
+    retained = after_run - baseline
+    del scheduler, expander
+    rerun_scheduler, _, rerun_elapsed = run()
+    tracemalloc.stop()
+    result = {
+        "items": args.queue_items,
+        "done": counts[core.ITEM_DONE],
+        "failed": counts[core.ITEM_FAILED],
+        "seconds": elapsed,
+        "items_per_s": args.queue_items / elapsed,
+        "peak_kib": (peak - baseline) / 1024,
+        "retained_kib": retained / 1024,
+        "bytes_per_item": retained / args.queue_items,
+        "rerun_seconds": rerun_elapsed,
+        "rerun_skipped": rerun_scheduler.skipped,
+    }
+    try:
+        import resource
+        result["max_rss_kib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform == "darwin" else 1)
+    except ImportError:
+        pass
+    return result
+
+def bench_postprocess(core, args, workdir):
+    set_fake_options(args.size, speed=args.postprocess_speed)
+    os.environ["UD_BENCH_FFMPEG_TIME"] = str(args.ffmpeg_time)
+    steps = [core.POSTPROCESS_METADATA, core.POSTPROCESS_THUMBNAIL, core.POSTPROCESS_AUDIO]
+    urls = [f"https://www.youtube.com/watch?v=post{position:07d}" for position in range(args.postprocess_items)]
+    scheduler = make_scheduler(core, os.path.join(workdir, "postprocess"), args.workers, write_thumbnail=True)
+    scheduler.postprocessor = core.PostProcessor(steps, args.postprocess_workers)
+    started = time.perf_counter()
+    scheduler.start(urls)
+    wait_for(scheduler)
+    elapsed = time.perf_counter() - started
+    scheduler.postprocessor.shutdown()
+    jobs, summary = scheduler.report()
+    return {
+        "items": len(urls),
+        "failed": summary["failed"],
+        "seconds": elapsed,
+        "items_per_s": summary["done"] / elapsed,
+        "download_total_s": summary["phase_seconds"]["download"],
+        "postprocess_total_s": summary["phase_seconds"]["postprocess"],
+    }
+
+def bench_audio(core, args, workdir):
+    folder = os.path.join(workdir, "audio")
+    os.makedirs(folder)
+    files = []
+    for position in range(args.audio_files):
+        path = os.path.join(folder, f"clip{position:03d}.mp4")
+        with open(path, "wb") as f:
+            f.write(bytes(256 * 1024))
+        files.append(path)
+    os.environ["UD_BENCH_FFMPEG_TIME"] = str(args.ffmpeg_time)
+    started = time.perf_counter()
+    results = core.extract_audio_many(files)
+    elapsed = time.perf_counter() - started
+    return {
+        "files": len(files),
+        "failed": results.count(False),
+        "seconds": elapsed,
+        "files_per_s": len(files) / elapsed,
+    }
+
+SCENARIOS = {
+    "formats": bench_formats,
+    "throughput": bench_throughput,
+    "signals": bench_signals,
+    "memory": bench_memory,
+    "postprocess": bench_postprocess,
+    "audio": bench_audio,
+}
+
+def load_previous(path):
+    if not os.path.exists(path):
+        return None
+    previous = None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                previous = json.loads(line)
+    return previous
+
+def format_change(value, old):
+    if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+        return ""
+    return f"{(value - old) * 100 / old:+.1f}%"
+
+def print_results(record, previous):
+    if previous:
+        print(f"compared with {(previous.get('commit') or 'unknown')[:10]} ({previous.get('date')})")
+        if previous.get("options") != record["options"]:
+            print("note: the previous run used different options")
+    for name, metrics in record["scenarios"].items():
+        print(f"\n{name}")
+        old_metrics = ((previous or {}).get("scenarios") or {}).get(name) or {}
+        for key, value in metrics.items():
+            shown = f"{value:.2f}" if isinstance(value, float) else str(value)
+            print(f"  {key:<26}{shown:>14}  {format_change(value, old_metrics.get(key))}")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for YouTube Downloader.")
+    parser.add_argument("scenarios", nargs="*", metavar="scenario",
+                        help=f"scenarios to run: {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--items", type=int, default=100, help="downloads in the throughput run (default: 100)")
+    parser.add_argument("--workers", type=int, default=4, help="parallel downloads (default: 4)")
+    parser.add_argument("--size", type=int, default=MiB, help="bytes per video in the throughput run")
+    parser.add_argument("--parse-iterations", type=int, default=2000, help="iterations per format-parse measurement")
+    parser.add_argument("--signal-items", type=int, default=12, help="downloads in the UI-signal run (default: 12)")
+    parser.add_argument("--signal-size", type=int, default=4 * MiB, help="bytes per video in the UI-signal run")
+    parser.add_argument("--signal-speed", type=int, default=2 * MiB, help="bytes/s per download in the UI-signal run")
+    parser.add_argument("--queue-items", type=int, default=1000, help="playlist length in the memory run (default: 1000)")
+    parser.add_argument("--memory-workers", type=int, default=8, help="parallel downloads in the memory run")
+    parser.add_argument("--memory-size", type=int, default=16 * 1024, help="bytes per video in the memory run")
+    parser.add_argument("--postprocess-items", type=int, default=16, help="downloads in the post-processing run")
+    parser.add_argument("--postprocess-speed", type=int, default=2 * MiB,
+                        help="bytes/s per download in the post-processing run")
+    parser.add_argument("--postprocess-workers", type=int, help="post-processing pool size (default: CPU count)")
+    parser.add_argument("--ffmpeg-time", type=float, default=0.2, help="seconds each fake ffmpeg call takes")
+    parser.add_argument("--audio-files", type=int, default=20, help="files in the audio extraction run")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="JSON lines file the results are appended to")
+    parser.add_argument("--no-save", action="store_true", help="print the results without recording them")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary working folder")
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(unknown)}")
+    names = args.scenarios or list(SCENARIOS)
+    workdir = tempfile.mkdtemp(prefix="ud-bench-")
+    prepare_environment(workdir)
+
+    from media_server import MediaServer
+    import ud_core as core
+
+    server = MediaServer().start()
+    os.environ["UD_BENCH_MEDIA"] = server.url
+    commit, dirty = git_state()
+    record = {
+        "commit": commit,
+        "dirty": dirty,
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": {key: value for key, value in vars(args).items() if key not in ("scenarios", "results", "no_save", "keep")},
+        "scenarios": {},
+    }
+    try:
+        for name in names:
+            print(f"running {name}...", file=sys.stderr, flush=True)
+            record["scenarios"][name] = SCENARIOS[name](core, args, workdir)
+    finally:
+        server.stop()
+        if args.keep:
+            print(f"working folder: {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    previous = load_previous(args.results)
+    print_results(record, previous)
+    if not args.no_save:
+        with open(args.results, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
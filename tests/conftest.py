@@ -0,0 +1,15 @@
+import os
+import sys
+import json
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIXTURES = os.path.join(ROOT, "bench", "fixtures")
+
+@pytest.fixture
+def video_info():
+    with open(os.path.join(FIXTURES, "video.json"), encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,83 @@
+import pytest
+
+from ud_core import DEFAULT_FORMAT, FORMAT_POLICIES, FormatPolicy, parse_format_policy, quality_choices
+
+def picked_spec(info, rules):
+    choice = parse_format_policy(rules).choice(info)
+    return choice and choice[1]
+
+@pytest.mark.parametrize("rules, spec", [
+    ("1080p", "137+140"),
+    ("1080p-mp4", "137+140"),
+    ("720p", "136+140"),
+    ("compact", "137+140"),
+    ("saver", "135+140"),
+    ("audio", "140"),
+    ("codec=vp9,height=720", "247+140"),
+    ("height=1080,size=100M", "134+140"),
+    ("height=1080,size=10M,fallback=audio", "140"),
+])
+def test_pick_from_recorded_formats(video_info, rules, spec):
+    assert picked_spec(video_info, rules) == spec
+
+def test_pick_sizes_include_audio(video_info):
+    assert parse_format_policy("720p").choice(video_info)[2] == 179039618 + 10262875
+
+def test_nothing_fits(video_info):
+    assert parse_format_policy("height=1080,size=10M").choice(video_info) is None
+    label, spec, size = parse_format_policy("height=1080,size=10M,fallback=none").choice(video_info)
+    assert size is None and spec == parse_format_policy("height=1080,size=10M,fallback=none").selector()
+
+def test_default_policy_keeps_default_format(video_info):
+    policy = parse_format_policy("best")
+    assert policy.is_default()
+    assert policy.selector() == DEFAULT_FORMAT
+    assert parse_format_policy("").selector() == DEFAULT_FORMAT
+    assert quality_choices(video_info, policy) == quality_choices(video_info)
+
+def test_policy_choice_comes_first(video_info):
+    choices = quality_choices(video_info, parse_format_policy("720p"))
+    assert choices[0][1] == "136+140"
+    assert choices[1][1] == DEFAULT_FORMAT
+
+def test_selector():
+    assert FormatPolicy(max_height=720).selector() == (
+        "bestvideo[height<=?720]+bestaudio[acodec^=mp4a]/bestvideo[height<=?720]+bestaudio/best[height<=?720]/"
+        + DEFAULT_FORMAT
+    )
+    selector = parse_format_policy("height=1080,codec=avc1,size=500M,fallback=audio").selector()
+    assert selector.startswith("bestvideo[height<=?1080][filesize<=?471859200][filesize_approx<=?471859200]"
+                               "[vcodec~='^(avc1|h264)']+bestaudio[acodec^=mp4a][filesize<=?52428800]"
+                               "[filesize_approx<=?52428800]/best[height<=?1080][filesize<=?524288000]")
+    assert selector.endswith("/bestaudio[acodec^=mp4a]/bestaudio")
+    assert parse_format_policy("height=720,fallback=none").selector().endswith("/best[height<=?720]")
+    assert parse_format_policy("audio").selector("mkv") == "bestaudio"
+
+def yt_dlp_select(info, selector):
+    yt_dlp = pytest.importorskip("yt_dlp")
+    ydl = yt_dlp.YoutubeDL({'quiet': True})
+    formats = [dict(fmt, protocol=fmt.get('protocol') or 'https') for fmt in info['formats']]
+    return list(ydl.build_format_selector(selector)(
+        {'formats': formats, 'has_merged_format': False, 'incomplete_formats': False}
+    ))
+
+def test_selector_is_valid_for_yt_dlp(video_info):
+    for rules in FORMAT_POLICIES.values():
+        assert yt_dlp_select(video_info, parse_format_policy(rules).selector()), rules
+
+@pytest.mark.parametrize("rules", ["height=1080,size=100M", "height=1080,size=50M", "size=300M", "saver", "compact"])
+def test_selector_size_cap_includes_audio(video_info, rules):
+    policy = parse_format_policy(rules)
+    selected, = yt_dlp_select(video_info, policy.selector())
+    streams = selected.get('requested_formats') or [selected]
+    assert sum(stream.get('filesize') or stream['filesize_approx'] for stream in streams) <= policy.max_size
+
+def test_parse_format_policy():
+    policy = parse_format_policy("Height=1080p, codec=AVC1, size=1.5G, fallback=audio")
+    assert (policy.max_height, policy.codec, policy.max_size, policy.fallback) == (1080, "avc1", 1536 * 1024 ** 2, "audio")
+    assert parse_format_policy("AUDIO").audio_only
+
+@pytest.mark.parametrize("rules", ["height=abc", "codec=h265", "foo", "size=5X", "fallback=x", "audio=1"])
+def test_parse_format_policy_rejects(rules):
+    with pytest.raises(ValueError):
+        parse_format_policy(rules)
@@ -0,0 +1,67 @@
+from ud_core import (
+    DEFAULT_FORMAT, parse_video_formats, best_audio_format, estimate_download_size, quality_choices,
+    render_formats_table, format_size,
+)
+
+def formats_by_id(info):
+    return {fmt['format_id']: fmt for fmt in parse_video_formats(info)}
+
+def test_parse_video_formats_skips_audio_and_storyboards(video_info):
+    formats = formats_by_id(video_info)
+    assert len(formats) == 23
+    assert not any(format_id.startswith('sb') for format_id in formats)
+    assert not {'139', '140', '249', '250', '251'} & set(formats)
+
+def test_parse_video_formats_fields(video_info):
+    fmt = formats_by_id(video_info)['137']
+    assert fmt == {
+        'format_id': '137', 'ext': 'mp4', 'width': 1920, 'height': 1080, 'resolution': '1920x1080', 'fps': 60,
+        'vcodec': 'avc1.4d401e', 'acodec': 'none', 'size_bytes': 267265236, 'size': format_size(267265236),
+    }
+    assert formats_by_id(video_info)['18']['acodec'] == 'mp4a.40.2'
+
+def test_parse_video_formats_handles_missing_fields():
+    info = {'formats': [
+        {'format_id': 22, 'vcodec': 'avc1', 'height': 720, 'resolution': 'hd'},
+        {'format_id': 'x', 'vcodec': 'avc1'},
+        {'format_id': 'y', 'height': 480},
+    ]}
+    formats = parse_video_formats(info)
+    assert [fmt['format_id'] for fmt in formats] == ['22']
+    assert formats[0]['resolution'] == 'hd'
+    assert formats[0]['size_bytes'] is None and formats[0]['size'] == 'N/A'
+    assert parse_video_formats({}) == []
+
+def test_best_audio_format(video_info):
+    assert best_audio_format(video_info)['format_id'] == '251'
+    assert best_audio_format({'formats': []}) is None
+
+def test_estimate_download_size(video_info):
+    formats = formats_by_id(video_info)
+    audio = best_audio_format(video_info)
+    assert estimate_download_size(formats['137'], audio) == 267265236 + 10635350
+    assert estimate_download_size(formats['18'], audio) == 39700000
+    assert estimate_download_size(formats['137'], None) == 267265236
+    assert estimate_download_size(dict(formats['137'], size_bytes=None), audio) is None
+    assert estimate_download_size(formats['137'], dict(audio, filesize=None)) is None
+
+def test_quality_choices(video_info):
+    choices = quality_choices(video_info)
+    assert len(choices) == 24
+    label, spec, size = choices[0]
+    assert (label, spec) == ("بهترین کیفیت (3840x2160)", DEFAULT_FORMAT)
+    assert size == 445630120 + 10635350
+    assert choices[1][1] == '313+bestaudio'
+    assert choices[-1][1] == '394+bestaudio'
+    assert all(spec.endswith('+bestaudio') for _, spec, _ in choices[1:])
+    assert quality_choices({}) == [("بهترین کیفیت", DEFAULT_FORMAT, None)]
+
+def test_render_formats_table(video_info):
+    lines = render_formats_table(video_info).splitlines()
+    assert lines[0].split() == ['ID', 'EXT', 'RESOLUTION', 'FPS', 'VCODEC', 'ACODEC', 'SIZE']
+    assert len(lines) == len(video_info['formats']) + 2
+    rows = {line.split()[0]: line for line in lines[2:]}
+    assert 'audio only' in rows['140']
+    assert rows['137'].split()[:3] == ['137', 'mp4', '1920x1080']
+    assert rows['137'].endswith(format_size(267265236))
+    assert rows['sb0'].endswith('N/A')
@@ -0,0 +1,145 @@
+import os
+import sys
+import threading
+
+import pytest
+
+import ud_core
+from ud_core import (
+    ENGINE_SUBPROCESS, ITEM_DONE, ITEM_FAILED, ITEM_FILTERED, ITEM_QUEUED, ITEM_RUNNING, FAILURE_UNAVAILABLE, FAILURE_TRANSIENT,
+    DownloadJob, DownloadScheduler, DownloadIndex, BatchItem, PlaylistFilter, QueueStore,
+)
+from conftest import ROOT
+
+FAKE_YTDLP = os.path.join(ROOT, "bench", "fake_yt_dlp.py")
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="the fake yt-dlp wrapper is a shell script")
+
+@pytest.fixture
+def fake_ytdlp(tmp_path, monkeypatch):
+    wrapper = tmp_path / "yt-dlp"
+    wrapper.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_YTDLP}" "$@"\n')
+    wrapper.chmod(0o755)
+    monkeypatch.setattr(ud_core, "YTDLP_BIN", str(wrapper))
+    monkeypatch.setenv("UD_BENCH_SIZE", str(64 * 1024))
+    monkeypatch.setenv("UD_BENCH_CHUNK", str(16 * 1024))
+    monkeypatch.delenv("UD_BENCH_MEDIA", raising=False)
+    return tmp_path
+
+def make_scheduler(folder, workers=3, **callbacks):
+    def build(item):
+        return DownloadJob(item.url, item.format_spec or "best", str(folder / "out" / "%(id)s.%(ext)s"))
+    return DownloadScheduler(build, workers, ENGINE_SUBPROCESS, **callbacks)
+
+def video_urls(count, query=""):
+    return [f"https://www.youtube.com/watch?v=test{index:07d}{query}" for index in range(count)]
+
+def test_downloads_every_item(fake_ytdlp):
+    scheduler = make_scheduler(fake_ytdlp)
+    scheduler.start(video_urls(6))
+    assert scheduler.wait(60)
+    assert scheduler.counts()[ITEM_DONE] == 6
+    for item in scheduler.items:
+        assert item.progress == 100
+        assert os.path.getsize(item.output_path) == 64 * 1024
+
+def test_runs_at_most_max_workers_at_once(fake_ytdlp, monkeypatch):
+    monkeypatch.setenv("UD_BENCH_SPEED", str(256 * 1024))
+    lock = threading.Lock()
+    running = []
+
+    def on_item_changed(index):
+        with lock:
+            running.append(sum(item.status == ITEM_RUNNING for item in scheduler.items))
+
+    scheduler = make_scheduler(fake_ytdlp, workers=2, on_item_changed=on_item_changed)
+    scheduler.start(video_urls(5))
+    assert scheduler.wait(60)
+    assert scheduler.counts()[ITEM_DONE] == 5
+    assert max(running) == 2
+
+def test_failures_are_classified_and_retried(fake_ytdlp):
+    scheduler = make_scheduler(fake_ytdlp)
+    scheduler.RETRY_BASE_DELAY = 0.05
+    scheduler.max_retries = 2
+    urls = video_urls(1) + [f"{video_urls(1)[0]}&fail=404", f"{video_urls(1)[0]}&fail=503"]
+    scheduler.start(urls)
+    assert scheduler.wait(60)
+    done, unavailable, transient = scheduler.items
+    assert done.status == ITEM_DONE
+    assert (unavailable.status, unavailable.failure, unavailable.attempts) == (ITEM_FAILED, FAILURE_UNAVAILABLE, 1)
+    assert (transient.status, transient.failure, transient.attempts) == (ITEM_FAILED, FAILURE_TRANSIENT, 3)
+
+def test_missing_binary_fails_items(fake_ytdlp, monkeypatch):
+    monkeypatch.setattr(ud_core, "YTDLP_BIN", str(fake_ytdlp / "missing-yt-dlp"))
+    scheduler = make_scheduler(fake_ytdlp)
+    scheduler.start(video_urls(2))
+    assert scheduler.wait(30)
+    assert scheduler.counts()[ITEM_FAILED] == 2
+
+def test_only_downloaded_files_are_indexed(fake_ytdlp, tmp_path):
+    archive = tmp_path / "archive.txt"
+    archive.write_text("youtube test0000000\n")
+    index = DownloadIndex(str(tmp_path / "index.sqlite3"))
+
+    def build(item):
+        return DownloadJob(item.url, "best", str(tmp_path / "out" / "%(id)s.%(ext)s"), download_archive=str(archive))
+
+    scheduler = DownloadScheduler(build, 2, ENGINE_SUBPROCESS, index=index)
+    scheduler.start(video_urls(2))
+    assert scheduler.wait(30)
+    assert scheduler.counts()[ITEM_DONE] == 2
+    assert index.get(video_urls(1)[0]) is None
+    assert index.count() == 1
+    assert index.is_current(index.get(video_urls(2)[1]), "best")
+
+def test_enqueue_after_stop_waits_for_resume(fake_ytdlp):
+    scheduler = make_scheduler(fake_ytdlp)
+    scheduler.start(video_urls(1))
+    scheduler.stop()
+    assert scheduler.wait(30)
+    scheduler.enqueue(video_urls(2, "&late=1"))
+    assert not scheduler.active
+    assert [item.status for item in scheduler.items[1:]] == [ITEM_QUEUED] * 2
+    scheduler.resume()
+    scheduler.enqueue(video_urls(1, "&new=1"))
+    assert scheduler.wait(60)
+    assert [item.status for item in scheduler.items[1:]] == [ITEM_DONE] * 3
+
+def test_deferred_date_range_is_enforced_per_item(fake_ytdlp, tmp_path):
+    store = QueueStore(str(tmp_path / "queue.sqlite3"))
+    index = DownloadIndex(str(tmp_path / "index.sqlite3"))
+    scheduler = make_scheduler(fake_ytdlp, store=store, index=index)
+    playlist_filter = PlaylistFilter(date_before="20231231")
+    items = []
+    for url in video_urls(2):
+        item = BatchItem(url)
+        item.date_after, item.date_before = playlist_filter.deferred_dates({})
+        items.append(item)
+    assert playlist_filter.deferred_dates({'upload_date': "20240115"}) == (None, None)
+    scheduler.start_items(items)
+    assert scheduler.wait(30)
+    counts = scheduler.counts()
+    assert (counts[ITEM_DONE], counts[ITEM_FILTERED]) == (0, 2)
+    assert not os.path.exists(fake_ytdlp / "out")
+    assert store.pending_count() == 0
+    assert index.count() == 0
+    assert [(item.date_after, item.date_before) for item in store.load()[0]] == [(None, "20231231")] * 2
+
+def test_fixed_rate_jobs_share_the_global_cap(fake_ytdlp):
+    limit = 1024 * 1024
+    lock = threading.Lock()
+    totals = []
+
+    def on_item_changed(index):
+        with lock:
+            totals.append(sum(task.job.rate_limit or 0 for task in scheduler.workers.values()))
+
+    scheduler = make_scheduler(fake_ytdlp, workers=2, on_item_changed=on_item_changed)
+    scheduler.bandwidth.global_limit = limit
+    scheduler.start(video_urls(8))
+    scheduler.set_max_workers(4)
+    assert scheduler.wait(60)
+    assert scheduler.counts()[ITEM_DONE] == 8
+    assert max(totals) > limit // 2
+    assert all(total <= limit for total in totals)
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+import sys
+import os
+import json
+import time
+import shutil
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import Request, urlopen
+from urllib.error import URLError
+
+from ud_core import (
+    YT_DLP_AVAILABLE, DEFAULT_FORMAT, ENGINE_INPROCESS, ENGINE_SUBPROCESS, ITEM_QUEUED, ITEM_RUNNING,
+    ITEM_DONE, ITEM_FAILED, ITEM_WAITING, ITEM_FILTERED, DownloadJob, DownloadScheduler, QueueStore, DownloadIndex,
+    ProbeError, probe_video,
+    render_formats_table, extract_audio_many, find_video_files, format_size, parse_rate, parse_schedule,
+    user_data_dir, default_archive_path, is_collection_url, parse_playlist_range, parse_date, PlaylistFilter,
+    CollectionExpander, save_batch_report, close_shared_cookies, ITEM_POSTPROCESSING, POSTPROCESS_STEPS,
+    POSTPROCESS_THUMBNAIL, PostProcessor, parse_postprocess_steps, FORMAT_POLICIES, parse_format_policy,
+)
+
+DAEMON_PORT = 8731
+REPORT_INTERVAL = 2
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="ud.py",
+        description="YouTube Downloader in headless mode. Run ud.py without arguments to start the GUI.",
+    )
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--batch", metavar="FILE", help="download every URL listed in FILE, one per line ('-' reads stdin)")
+    mode.add_argument("--probe", metavar="URL", help="print the title and available formats of URL")
+    mode.add_argument("--extract-audio", metavar="PATH", nargs="+", help="extract audio from video files or folders")
+    mode.add_argument("--daemon", action="store_true", help="run a local download daemon with an HTTP API")
+    mode.add_argument("--submit", metavar="FILE", help="queue the URLs listed in FILE on a running daemon")
+    mode.add_argument("--status", action="store_true", help="show the queue of a running daemon")
+    mode.add_argument("--rebuild-index", metavar="FOLDER", help="update the index of finished downloads by scanning FOLDER")
+
+    download = parser.add_argument_group("download options")
+    download.add_argument("--workers", type=int, default=3, help="concurrent downloads (default: 3)")
+    download.add_argument("--format", help=f"yt-dlp format selector (default: {DEFAULT_FORMAT})")
+    download.add_argument("--policy", default="", metavar="RULES",
+                          help=f"format policy used when --format is not given: {', '.join(FORMAT_POLICIES)}, "
+                               "or rules such as height=1080,codec=avc1,size=500M,fallback=audio")
+    download.add_argument("--output", default=os.path.join(os.getcwd(), "%(title)s.%(ext)s"),
+                          help="yt-dlp output template (default: ./%%(title)s.%%(ext)s)")
+    download.add_argument("--browser", default="None", help="read cookies once from this browser (firefox, chrome, ...)")
+    download.add_argument("--engine", choices=(ENGINE_INPROCESS, ENGINE_SUBPROCESS),
+                          default=ENGINE_INPROCESS if YT_DLP_AVAILABLE else ENGINE_SUBPROCESS,
+                          help="run yt-dlp in-process or as a subprocess")
+    download.add_argument("--fragments", type=int, default=1, help="concurrent fragments/connections per download")
+    download.add_argument("--aria2c", action="store_true", help="use aria2c as the external downloader")
+    download.add_argument("--limit-rate", default="", help="global speed cap shared by active downloads, e.g. 5M")
+    download.add_argument("--job-limit-rate", default="", help="speed cap for each download, e.g. 800K")
+    download.add_argument("--rate-schedule", default="", help="time windows for the global cap, e.g. '08:00-17:00=2M'")
+    download.add_argument("--retries", type=int, default=DownloadScheduler.MAX_RETRIES,
+                          help=f"retries for network and rate-limit failures (default: {DownloadScheduler.MAX_RETRIES})")
+    download.add_argument("--no-archive", action="store_true", help="do not skip videos that were already downloaded")
+    download.add_argument("--postprocess", default="", metavar="STEPS",
+                          help=f"comma-separated steps run after each download: {', '.join(POSTPROCESS_STEPS)}")
+    download.add_argument("--postprocess-workers", type=int, help="parallel post-processing jobs (default: CPU count)")
+    playlists = parser.add_argument_group("playlist and channel options")
+    playlists.add_argument("--items", default="", help="only take entries in this range of each playlist, e.g. 1-50 or 10-")
+    playlists.add_argument("--min-duration", type=int, help="skip entries shorter than this many seconds")
+    playlists.add_argument("--max-duration", type=int, help="skip entries longer than this many seconds")
+    playlists.add_argument("--date-after", default="", help="skip entries uploaded before this date (YYYY-MM-DD)")
+    playlists.add_argument("--date-before", default="", help="skip entries uploaded after this date (YYYY-MM-DD)")
+
+    download.add_argument("--report-dir", help="folder for the JSON/CSV timing report of --batch (default: app data folder)")
+    download.add_argument("-v", "--verbose", action="store_true", help="print yt-dlp output for every item")
+
+    parser.add_argument("--force-mp3", action="store_true", help="always re-encode extracted audio to MP3")
+    parser.add_argument("--port", type=int, default=DAEMON_PORT, help=f"daemon port on 127.0.0.1 (default: {DAEMON_PORT})")
+    return parser
+
+def read_urls(path):
+    stream = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    with stream:
+        return [line.strip() for line in stream if line.strip() and not line.lstrip().startswith('#')]
+
+def make_job_builder(args):
+    download_archive = None if args.no_archive else default_archive_path()
+    if download_archive:
+        os.makedirs(os.path.dirname(download_archive), exist_ok=True)
+
+    write_thumbnail = POSTPROCESS_THUMBNAIL in parse_postprocess_steps(args.postprocess)
+
+    def build(item):
+        return DownloadJob(
+            item.url, item.format_spec or args.format or DEFAULT_FORMAT, args.output, args.browser,
+            download_archive=download_archive,
+            concurrent_fragments=args.fragments,
+            external_downloader="aria2c" if args.aria2c else None,
+            write_thumbnail=write_thumbnail,
+        )
+    return build
+
+def make_playlist_filter(args):
+    start, end = parse_playlist_range(args.items)
+    return PlaylistFilter(
+        start, end, args.min_duration, args.max_duration, parse_date(args.date_after), parse_date(args.date_before),
+    )
+
+def expand_collections(args, scheduler, reporter, collections, format_spec=None):
+    expander = CollectionExpander(
+        scheduler, args.browser, make_playlist_filter(args), format_spec or args.format,
+        on_message=reporter.write,
+    )
+    expander.start(collections)
+    return expander
+
+def make_scheduler(args, reporter, store=None):
+    scheduler = DownloadScheduler(
+        make_job_builder(args), args.workers, args.engine, store, None if args.no_archive else DownloadIndex(),
+        on_item_changed=reporter.on_item_changed,
+        on_message=reporter.on_message,
+        on_progress=reporter.on_progress,
+    )
+    scheduler.max_retries = max(0, args.retries)
+    scheduler.bandwidth.global_limit = parse_rate(args.limit_rate)
+    scheduler.bandwidth.job_limit = parse_rate(args.job_limit_rate)
+    scheduler.bandwidth.schedule = parse_schedule(args.rate_schedule)
+    steps = parse_postprocess_steps(args.postprocess)
+    if steps:
+        scheduler.postprocessor = PostProcessor(steps, args.postprocess_workers)
+    reporter.scheduler = scheduler
+    return scheduler
+
+class ConsoleReporter:
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+        self.scheduler = None
+        self.statuses = {}
+        self.last_report = time.monotonic()
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        with self.lock:
+            print(text, file=sys.stderr, flush=True)
+
+    def on_item_changed(self, index):
+        item = self.scheduler.items[index]
+        if self.statuses.get(index) == item.status:
+            return
+        self.statuses[index] = item.status
+        total = len(self.scheduler.items)
+        if item.status == ITEM_RUNNING:
+            self.write(f"[{index + 1}/{total}] started: {item.url}")
+        elif item.status == ITEM_DONE:
+            self.write(f"[{index + 1}/{total}] done: {item.output_path or item.url}")
+        elif item.status == ITEM_FILTERED:
+            self.write(f"[{index + 1}/{total}] skipped, upload date out of range: {item.url}")
+        elif item.status == ITEM_FAILED:
+            self.write(f"[{index + 1}/{total}] failed ({item.failure}): {item.url}")
+        elif item.status == ITEM_WAITING:
+            self.write(f"[{index + 1}/{total}] retrying after {item.failure} failure: {item.url}")
+        elif item.status == ITEM_POSTPROCESSING:
+            self.write(f"[{index + 1}/{total}] post-processing: {item.output_path or item.url}")
+
+    def on_message(self, index, text):
+        if self.verbose or text.startswith("ERROR"):
+            self.write(f"[{index + 1}] {text}")
+
+    def on_progress(self, value):
+        now = time.monotonic()
+        if now - self.last_report < REPORT_INTERVAL:
+            return
+        self.last_report = now
+        counts = self.scheduler.counts()
+        self.write(
+            f"{value}% | {format_size(self.scheduler.current_throughput())}/s | "
+            f"done {counts[ITEM_DONE]} filtered {counts[ITEM_FILTERED]} failed {counts[ITEM_FAILED]} "
+            f"running {counts[ITEM_RUNNING]} post-processing {counts[ITEM_POSTPROCESSING]} queued {counts[ITEM_QUEUED]} "
+            f"waiting {counts[ITEM_WAITING]}"
+        )
+
+def run_batch(args):
+    urls = read_urls(args.batch)
+    if not urls:
+        print("No URLs to download.", file=sys.stderr)
+        return 2
+    reporter = ConsoleReporter(args.verbose)
+    scheduler = make_scheduler(args, reporter)
+    collections = [url for url in urls if is_collection_url(url)]
+    started = time.monotonic()
+    scheduler.hold()
+    scheduler.start([url for url in urls if not is_collection_url(url)])
+    expander = expand_collections(args, scheduler, reporter, collections) if collections else None
+    scheduler.release()
+    try:
+        while not scheduler.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        print("Stopping...", file=sys.stderr)
+        if expander is not None:
+            expander.stop()
+        scheduler.stop()
+        scheduler.wait()
+    counts = scheduler.counts()
+    print(
+        f"Finished in {time.monotonic() - started:.1f}s: done {counts[ITEM_DONE]} "
+        f"({scheduler.skipped} already downloaded), out of date range {counts[ITEM_FILTERED]}, "
+        f"failed {counts[ITEM_FAILED]}, not started {counts[ITEM_QUEUED]}",
+        file=sys.stderr,
+    )
+    print_report(args, scheduler)
+    if counts[ITEM_FAILED] or counts[ITEM_QUEUED] or (expander is not None and expander.errors):
+        return 1
+    return 0
+
+def print_report(args, scheduler):
+    jobs, summary = scheduler.report()
+    busy = sum(summary["phase_seconds"].values())
+    phases = ", ".join(
+        f"{phase} {seconds:.1f}s ({seconds * 100 / busy:.0f}%)" if busy else f"{phase} 0s"
+        for phase, seconds in summary["phase_seconds"].items()
+    )
+    print(
+        f"Downloaded {format_size(summary['bytes'])} at {format_size(summary['throughput'])}/s overall, "
+        f"peak {format_size(summary['peak_speed'])}/s per job, {summary['retries']} retries\n"
+        f"Time per phase (all jobs): {phases}",
+        file=sys.stderr,
+    )
+    try:
+        json_path, csv_path = save_batch_report(jobs, summary, args.report_dir)
+    except OSError as e:
+        print(f"Could not save the timing report: {e}", file=sys.stderr)
+        return
+    print(f"Timing report: {json_path} {csv_path}", file=sys.stderr)
+
+def run_probe(args):
+    try:
+        info = probe_video(args.probe, args.browser)
+    except ProbeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(info.get('title') or args.probe)
+    print(render_formats_table(info))
+    if args.policy:
+        choice = args.format_policy.choice(info)
+        print(f"Policy choice: {choice[1] if choice else DEFAULT_FORMAT} ({format_size(choice[2]) if choice else 'N/A'})")
+    return 0
+
+def run_rebuild_index(args):
+    if not os.path.isdir(args.rebuild_index):
+        print(f"Not a folder: {args.rebuild_index}", file=sys.stderr)
+        return 2
+    download_index = DownloadIndex()
+    added, moved, removed = download_index.rebuild(args.rebuild_index)
+    print(f"Index rebuilt: {added} added, {moved} moved, {removed} removed, {download_index.count()} in total.")
+    return 0
+
+def run_extract_audio(args):
+    video_files = []
+    for path in args.extract_audio:
+        video_files.extend(find_video_files(path) if os.path.isdir(path) else [path])
+    if not video_files:
+        print("No video files found.", file=sys.stderr)
+        return 2
+    total = len(video_files)
+    results = extract_audio_many(
+        video_files, args.force_mp3,
+        on_planned=lambda index, label: print(f"[{index + 1}/{total}] {video_files[index]}: {label}", file=sys.stderr),
+        on_finished=lambda index, audio_file: print(f"[{index + 1}/{total}] done: {audio_file}", file=sys.stderr),
+        on_error=lambda index, message: print(f"[{index + 1}/{total}] failed: {message}", file=sys.stderr),
+    )
+    return 0 if all(results) else 1
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    def local_host(self):
+        host = (self.headers.get("Host") or "").rsplit(":", 1)[0]
+        if host in ("127.0.0.1", "localhost"):
+            return True
+        self.send_json({"error": "unexpected Host header"}, 403)
+        return False
+
+    def trusted_post(self):
+        if not self.local_host():
+            return False
+        if self.headers.get("Origin") is not None:
+            self.send_json({"error": "cross-origin requests are not allowed"}, 403)
+            return False
+        if (self.headers.get("Content-Type") or "").split(";")[0].strip().lower() != "application/json":
+            self.send_json({"error": "Content-Type must be application/json"}, 415)
+            return False
+        return True
+
+    def do_GET(self):
+        if not self.local_host():
+            return
+        scheduler = self.server.scheduler
+        if self.path == "/status":
+            self.send_json({
+                "counts": scheduler.counts(),
+                "progress": scheduler.aggregate_progress(),
+                "throughput": scheduler.current_throughput(),
+            })
+        elif self.path == "/jobs":
+            with scheduler.lock:
+                jobs = [
+                    {"url": item.url, "format": item.format_spec, "status": item.status, "failure": item.failure,
+                     "progress": item.progress, "output_path": item.output_path}
+                    for item in scheduler.items
+                ]
+            self.send_json(jobs)
+        else:
+            self.send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        if not self.trusted_post():
+            return
+        scheduler = self.server.scheduler
+        if self.path == "/jobs":
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                urls = [url.strip() for url in payload.get("urls") or [] if isinstance(url, str) and url.strip()]
+                format_spec = payload.get("format")
+            except (ValueError, AttributeError, TypeError):
+                self.send_json({"error": "expected a JSON object with a 'urls' list"}, 400)
+                return
+            if format_spec is not None and not isinstance(format_spec, str):
+                self.send_json({"error": "'format' must be a string"}, 400)
+                return
+            videos = [url for url in urls if not is_collection_url(url)]
+            collections = [url for url in urls if is_collection_url(url)]
+            scheduler.resume()
+            scheduler.enqueue(videos, [format_spec] * len(videos))
+            if collections:
+                with scheduler.lock:
+                    expanders = [expander for expander in self.server.expanders if not expander.finished]
+                    expanders.append(
+                        expand_collections(self.server.args, scheduler, self.server.reporter, collections, format_spec)
+                    )
+                    self.server.expanders = expanders
+            self.send_json({"queued": len(videos), "expanding": len(collections)})
+        elif self.path == "/retry":
+            self.send_json({"retrying": scheduler.retry_failed()})
+        elif self.path == "/stop":
+            stop_daemon(self.server)
+            self.send_json({"stopped": True})
+        else:
+            self.send_json({"error": "not found"}, 404)
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def stop_daemon(server):
+    with server.scheduler.lock:
+        for expander in server.expanders:
+            expander.stop()
+        server.expanders = []
+    server.scheduler.stop()
+
+def run_daemon(args):
+    store = QueueStore(os.path.join(user_data_dir(), "daemon-queue.sqlite3"))
+    reporter = ConsoleReporter(args.verbose)
+    scheduler = make_scheduler(args, reporter, store)
+    if store.pending_count():
+        items, options = store.load()
+        print(f"Resuming {store.pending_count()} unfinished item(s).", file=sys.stderr)
+        scheduler.start_items(items, options)
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), DaemonHandler)
+    server.scheduler = scheduler
+    server.reporter = reporter
+    server.args = args
+    server.verbose = args.verbose
+    server.expanders = []
+    print(f"Daemon listening on http://127.0.0.1:{args.port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping...", file=sys.stderr)
+        stop_daemon(server)
+        scheduler.wait()
+    finally:
+        server.server_close()
+    return 0
+
+def daemon_request(args, path, payload=None):
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    request = Request(f"http://127.0.0.1:{args.port}{path}", data=data, headers={"Content-Type": "application/json"})
+    with urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+def run_submit(args):
+    urls = read_urls(args.submit)
+    if not urls:
+        print("No URLs to submit.", file=sys.stderr)
+        return 2
+    payload = {"urls": urls}
+    if args.format:
+        payload["format"] = args.format
+    try:
+        result = daemon_request(args, "/jobs", payload)
+    except URLError as e:
+        print(f"Could not reach the daemon on port {args.port}: {e.reason}", file=sys.stderr)
+        return 1
+    print(f"Queued {result['queued']} URL(s), expanding {result['expanding']} playlist(s)/channel(s).")
+    return 0
+
+def run_status(args):
+    try:
+        status = daemon_request(args, "/status")
+        jobs = daemon_request(args, "/jobs")
+    except URLError as e:
+        print(f"Could not reach the daemon on port {args.port}: {e.reason}", file=sys.stderr)
+        return 1
+    for index, job in enumerate(jobs):
+        state = f"{job['status']} ({job['failure']})" if job['failure'] else job['status']
+        print(f"{index + 1:>4} {state:<22} {job['progress']:>3}% {job['output_path'] or job['url']}")
+    counts = status["counts"]
+    print(
+        f"{status['progress']}% | {format_size(status['throughput'])}/s | done {counts[ITEM_DONE]} "
+        f"filtered {counts[ITEM_FILTERED]} failed {counts[ITEM_FAILED]} running {counts[ITEM_RUNNING]} "
+        f"post-processing {counts[ITEM_POSTPROCESSING]} queued {counts[ITEM_QUEUED]} waiting {counts[ITEM_WAITING]}"
+    )
+    return 0
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        parse_rate(args.limit_rate)
+        parse_rate(args.job_limit_rate)
+        parse_schedule(args.rate_schedule)
+        make_playlist_filter(args)
+        steps = parse_postprocess_steps(args.postprocess)
+        args.format_policy = parse_format_policy(args.policy)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.policy and not args.format:
+        args.format = args.format_policy.selector()
+    if steps and not shutil.which("ffmpeg"):
+        parser.error("--postprocess needs ffmpeg in PATH")
+
+    try:
+        if args.batch:
+            return run_batch(args)
+        if args.probe:
+            return run_probe(args)
+        if args.extract_audio:
+            return run_extract_audio(args)
+        if args.daemon:
+            return run_daemon(args)
+        if args.submit:
+            return run_submit(args)
+        if args.rebuild_index:
+            return run_rebuild_index(args)
+        return run_status(args)
+    finally:
+        close_shared_cookies()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,2443 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+import sys
+import subprocess
+import re
+import os
+import json
+import csv
+import shutil
+import time
+import random
+import datetime
+import sqlite3
+import hashlib
+import tempfile
+import itertools
+import threading
+import contextlib
+import importlib.util
+import logging
+import logging.handlers
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+YT_DLP_AVAILABLE = importlib.util.find_spec("yt_dlp") is not None
+
+DEFAULT_FORMAT = "bestvideo+bestaudio/best"
+
+def format_size(size_bytes):
+    if not size_bytes:
+        return 'N/A'
+    size = float(size_bytes)
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024 or unit == 'GiB':
+            return f'{size:.2f}{unit}'
+        size /= 1024
+
+def format_filesize(fmt):
+    return fmt.get('filesize') or fmt.get('filesize_approx')
+
+def parse_video_formats(info):
+    formats = []
+    for fmt in info.get('formats') or []:
+        if fmt.get('vcodec') in (None, 'none') or not fmt.get('height'):
+            continue
+        width, height = fmt.get('width'), fmt['height']
+        size_bytes = format_filesize(fmt)
+        formats.append({
+            'format_id': str(fmt['format_id']),
+            'ext': fmt.get('ext') or '',
+            'width': width,
+            'height': height,
+            'resolution': f'{width}x{height}' if width else fmt.get('resolution') or f'{height}p',
+            'fps': fmt.get('fps'),
+            'vcodec': fmt.get('vcodec') or '',
+            'acodec': fmt.get('acodec') or 'none',
+            'size_bytes': size_bytes,
+            'size': format_size(size_bytes),
+        })
+    return formats
+
+def render_formats_table(info):
+    lines = [f"{'ID':<12}{'EXT':<7}{'RESOLUTION':<14}{'FPS':<6}{'VCODEC':<16}{'ACODEC':<14}SIZE", '-' * 80]
+    for fmt in info.get('formats') or []:
+        vcodec = fmt.get('vcodec') or ''
+        audio_only = vcodec == 'none' and fmt.get('acodec') not in (None, 'none')
+        resolution = 'audio only' if audio_only else fmt.get('resolution') or ''
+        lines.append(
+            f"{str(fmt.get('format_id', '')):<12}{fmt.get('ext') or '':<7}{resolution:<14}"
+            f"{str(fmt.get('fps') or ''):<6}{vcodec[:15]:<16}{(fmt.get('acodec') or '')[:13]:<14}"
+            f"{format_size(format_filesize(fmt))}"
+        )
+    return '\n'.join(lines)
+
+YOUTUBE_ID_RE = re.compile(
+    r'(?:youtube(?:-nocookie)?\.com/(?:watch\?(?:.*&)?v=|embed/|shorts/|live/|v/)|youtu\.be/)([0-9A-Za-z_-]{11})'
+)
+
+CACHED_FORMAT_KEYS = (
+    'format_id', 'format_note', 'ext', 'vcodec', 'acodec', 'width', 'height', 'resolution',
+    'fps', 'tbr', 'abr', 'filesize', 'filesize_approx',
+)
+
+def canonical_video_key(url):
+    match = YOUTUBE_ID_RE.search(url)
+    if match:
+        return f'youtube:{match.group(1)}'
+    return f'url:{url.strip()}'
+
+def user_cache_dir():
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.join(os.path.expanduser("~"), "Library", "Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "YouTube-Downloader")
+
+def user_data_dir():
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.join(os.path.expanduser("~"), "Library", "Application Support")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "YouTube-Downloader")
+
+def default_save_path():
+    desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
+    if not os.path.exists(desktop_path):
+        desktop_path = os.path.expanduser("~")
+    return os.path.join(desktop_path, "%(title)s.%(ext)s")
+
+def default_archive_path():
+    return os.path.join(user_data_dir(), "download-archive.txt")
+
+def default_log_path():
+    return os.path.join(user_data_dir(), "logs", "ud.log")
+
+class LogBuffer:
+    def __init__(self, path=None, max_lines=5000, max_bytes=5 * 1024 * 1024, backup_count=3):
+        self.path = path or default_log_path()
+        self.lines = deque(maxlen=max_lines)
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.file_logger = logging.getLogger(f"youtube_downloader.{id(self)}")
+        self.file_logger.propagate = False
+        self.file_logger.setLevel(logging.INFO)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                self.path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.file_logger.addHandler(handler)
+        except OSError:
+            self.file_logger.disabled = True
+
+    def append(self, text):
+        with self.lock:
+            if len(self.lines) == self.lines.maxlen:
+                self.dropped += 1
+            self.lines.append(text)
+        self.file_logger.info(text)
+
+    def drain(self):
+        with self.lock:
+            lines, dropped = list(self.lines), self.dropped
+            self.lines.clear()
+            self.dropped = 0
+        return lines, dropped
+
+    def close(self):
+        for handler in list(self.file_logger.handlers):
+            self.file_logger.removeHandler(handler)
+            handler.close()
+
+class MetadataCache:
+    def __init__(self, path=None, ttl=24 * 3600, max_bytes=50 * 1024 * 1024):
+        self.path = path or os.path.join(user_cache_dir(), "metadata.sqlite3")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                "key TEXT PRIMARY KEY, data TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS metadata_accessed ON metadata (accessed)")
+            self.conn.commit()
+        except (OSError, sqlite3.Error):
+            self.conn = None
+
+    def get(self, url):
+        if self.conn is None or self.ttl <= 0:
+            return None
+        key = canonical_video_key(url)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT data, created FROM metadata WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self.conn.execute("DELETE FROM metadata WHERE key = ?", (key,))
+                    self.conn.commit()
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE metadata SET accessed = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, url, info):
+        if self.conn is None or self.ttl <= 0:
+            return
+        entry = {
+            'id': info.get('id'),
+            'title': info.get('title'),
+            'thumbnail': info.get('thumbnail'),
+            'duration': info.get('duration'),
+            'webpage_url': info.get('webpage_url'),
+            'formats': [
+                {key: fmt[key] for key in CACHED_FORMAT_KEYS if key in fmt}
+                for fmt in info.get('formats') or []
+            ],
+        }
+        data = json.dumps(entry, ensure_ascii=False)
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO metadata (key, data, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (canonical_video_key(url), data, len(data.encode('utf-8')), now, now)
+            )
+            self.evict(now)
+            self.conn.commit()
+
+    def evict(self, now):
+        self.conn.execute("DELETE FROM metadata WHERE created < ?", (now - self.ttl,))
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM metadata").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute("SELECT key, size FROM metadata ORDER BY accessed").fetchall():
+            self.conn.execute("DELETE FROM metadata WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        if self.conn is None:
+            return
+        with self.lock:
+            self.conn.execute("DELETE FROM metadata")
+            self.conn.commit()
+
+    def stats_text(self):
+        total = self.hits + self.misses
+        ratio = self.hits * 100 // total if total else 0
+        return f"کش اطلاعات: {self.hits} برخورد | {self.misses} عدم برخورد ({ratio}٪ موفق)"
+
+class ProbeError(Exception):
+    pass
+
+COOKIE_TTL = 30 * 60
+
+def normalize_browser(browser):
+    browser = (browser or "").strip().lower()
+    return None if browser in ("", "none") else browser
+
+def extract_browser_cookies(browser, path):
+    if YT_DLP_AVAILABLE:
+        from yt_dlp.cookies import extract_cookies_from_browser
+        extract_cookies_from_browser(browser).save(path)
+        return
+    creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    result = subprocess.run(
+        [YTDLP_BIN, "--cookies-from-browser", browser, "--cookies", path], capture_output=True, text=True,
+        errors="replace", creationflags=creationflags
+    )
+    if not os.path.exists(path) or not os.path.getsize(path):
+        raise ProbeError(result.stderr.strip() or result.stdout.strip())
+
+class BrowserCookies:
+    def __init__(self, browser, ttl=COOKIE_TTL):
+        self.browser = browser
+        self.ttl = ttl
+        self.folder = tempfile.mkdtemp(prefix="ud-cookies-")
+        self.path = os.path.join(self.folder, "cookies.txt")
+        self.lock = threading.Lock()
+        self.copies = itertools.count()
+        self.extracted_at = None
+        self.generation = 0
+        self.error = None
+
+    def stale(self):
+        return self.extracted_at is None or time.monotonic() - self.extracted_at > self.ttl
+
+    def refresh(self):
+        temp_path = f"{self.path}.new"
+        try:
+            extract_browser_cookies(self.browser, temp_path)
+            os.replace(temp_path, self.path)
+            self.error = None
+        except Exception as e:
+            self.error = str(e) or type(e).__name__
+        self.extracted_at = time.monotonic()
+        self.generation += 1
+
+    def acquire(self):
+        with self.lock:
+            if self.stale():
+                self.refresh()
+            if self.error is not None:
+                return None, self.generation
+            copy = os.path.join(self.folder, f"job-{next(self.copies)}.txt")
+            shutil.copyfile(self.path, copy)
+            return copy, self.generation
+
+    def invalidate(self, generation):
+        with self.lock:
+            if generation != self.generation:
+                return self.error is None
+            if self.error is not None:
+                return False
+            self.extracted_at = None
+            return True
+
+    def close(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+SHARED_COOKIES = {}
+SHARED_COOKIES_LOCK = threading.Lock()
+
+def shared_cookies(browser):
+    browser = normalize_browser(browser)
+    if browser is None:
+        return None
+    with SHARED_COOKIES_LOCK:
+        if browser not in SHARED_COOKIES:
+            SHARED_COOKIES[browser] = BrowserCookies(browser)
+        return SHARED_COOKIES[browser]
+
+def close_shared_cookies():
+    with SHARED_COOKIES_LOCK:
+        for cookies in SHARED_COOKIES.values():
+            cookies.close()
+        SHARED_COOKIES.clear()
+
+def cookie_args(browser, cookie_file=None):
+    if cookie_file:
+        return ["--cookies", cookie_file]
+    browser = normalize_browser(browser)
+    return ["--cookies-from-browser", browser] if browser else []
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+@contextlib.contextmanager
+def borrowed_cookies(browser):
+    cookies = shared_cookies(browser)
+    cookie_file, generation = cookies.acquire() if cookies is not None else (None, None)
+    try:
+        yield cookie_file, generation
+    finally:
+        if cookie_file:
+            remove_file(cookie_file)
+
+def probe_video(url, browser):
+    creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    generation = None
+    try:
+        with borrowed_cookies(browser) as (cookie_file, generation):
+            command = [YTDLP_BIN, *cookie_args(browser, cookie_file), "-J", "--no-playlist", "--", url]
+            result = subprocess.run(
+                command, check=True, capture_output=True, text=True, errors="replace", creationflags=creationflags
+            )
+        return json.loads(result.stdout)
+    except subprocess.CalledProcessError as e:
+        cookies = shared_cookies(browser)
+        if cookies is not None and generation is not None and classify_failure(e.stderr or "") == FAILURE_AUTH:
+            cookies.invalidate(generation)
+        raise ProbeError(describe_probe_error(e.stderr or "", creationflags))
+    except json.JSONDecodeError as e:
+        raise ProbeError(f"خطا در خواندن اطلاعات ویدیو: {e}")
+    except OSError as e:
+        raise ProbeError(launch_error(e))
+
+FAILURE_TRANSIENT = "transient"
+FAILURE_RATE_LIMITED = "rate_limited"
+FAILURE_UNAVAILABLE = "unavailable"
+FAILURE_NEEDS_UPDATE = "needs_update"
+FAILURE_AUTH = "auth"
+FAILURE_OTHER = "other"
+
+FAILURE_LABELS = {
+    FAILURE_TRANSIENT: "خطای موقت شبکه",
+    FAILURE_RATE_LIMITED: "محدودیت تعداد درخواست",
+    FAILURE_UNAVAILABLE: "ویدیو در دسترس نیست",
+    FAILURE_NEEDS_UPDATE: "نیاز به به‌روزرسانی yt-dlp",
+    FAILURE_AUTH: "نیاز به ورود یا کوکی معتبر",
+    FAILURE_OTHER: "خطای ناشناخته",
+}
+
+FAILURE_PATTERNS = (
+    (FAILURE_NEEDS_UPDATE, re.compile(r'not available on this app|please update|yt-dlp -U|nsig extraction failed', re.I)),
+    (FAILURE_RATE_LIMITED, re.compile(r'HTTP Error 429|Too Many Requests|rate[- ]limit', re.I)),
+    (FAILURE_AUTH, re.compile(
+        r'Sign in to confirm|cookies are no longer valid|use --cookies|login required|HTTP Error 401', re.I
+    )),
+    (FAILURE_UNAVAILABLE, re.compile(
+        r'Video unavailable|Private video|This video (?:is|has been) (?:private|removed|unavailable)|'
+        r'HTTP Error 404|HTTP Error 410|members[- ]only|not available in your country|Unsupported URL|'
+        r'account associated with this video has been terminated|copyright', re.I
+    )),
+    (FAILURE_TRANSIENT, re.compile(
+        r'HTTP Error (?:403|5\d\d)|timed? ?out|Connection (?:reset|refused|aborted)|Temporary failure|'
+        r'Network is unreachable|IncompleteRead|Remote end closed|urlopen error|Unable to download|'
+        r'fragment \d+ not found|giving up after', re.I
+    )),
+)
+
+RETRYABLE_FAILURES = (FAILURE_TRANSIENT, FAILURE_RATE_LIMITED)
+
+def classify_failure(error_output):
+    for failure, pattern in FAILURE_PATTERNS:
+        if pattern.search(error_output):
+            return failure
+    return FAILURE_OTHER
+
+def retry_delay(attempt, base, cap):
+    delay = min(cap, base * 2 ** max(attempt - 1, 0))
+    return random.uniform(delay / 2, delay)
+
+def describe_probe_error(error_output, creationflags):
+    if classify_failure(error_output) != FAILURE_NEEDS_UPDATE:
+        return f"خطا در دریافت کیفیت‌ها:\n{error_output}"
+    try:
+        current_version = subprocess.check_output(
+            [YTDLP_BIN, "--version"], text=True, creationflags=creationflags
+        ).strip()
+        return (
+            f"خطا: نسخه yt-dlp شما قدیمی است!\n\n"
+            f"نسخه فعلی شما: {current_version}\n"
+            f"یوتیوب درخواست‌های این نسخه را مسدود کرده است.\n\n"
+            f"لطفاً با دستور 'yt-dlp -U' آن را به‌روزرسانی کنید."
+        )
+    except Exception:
+        return "خطا: نسخه yt-dlp شما قدیمی است. لطفاً با دستور 'yt-dlp -U' آن را آپدیت کنید."
+
+def best_audio_format(info):
+    audio_formats = [
+        fmt for fmt in info.get('formats') or []
+        if fmt.get('vcodec') == 'none' and fmt.get('acodec') not in (None, 'none')
+    ]
+    return max(audio_formats, key=lambda fmt: fmt.get('abr') or fmt.get('tbr') or 0, default=None)
+
+def estimate_download_size(video_format, audio_format):
+    if not video_format['size_bytes']:
+        return None
+    if video_format['acodec'] != 'none' or audio_format is None:
+        return video_format['size_bytes']
+    audio_size = format_filesize(audio_format)
+    return video_format['size_bytes'] + audio_size if audio_size else None
+
+FALLBACK_BEST = "best"
+FALLBACK_AUDIO = "audio"
+FALLBACK_NONE = "none"
+FORMAT_FALLBACKS = (FALLBACK_BEST, FALLBACK_AUDIO, FALLBACK_NONE)
+
+CODEC_PATTERNS = {
+    'avc1': '^(avc1|h264)',
+    'vp9': '^(vp9|vp09)',
+    'av01': '^av01',
+}
+CONTAINER_CODECS = {
+    'mp4': (('avc1', 'av01'), 'mp4a'),
+    'webm': (('vp9', 'av01'), 'opus'),
+}
+
+FORMAT_POLICIES = {
+    "best": "",
+    "1080p": "height=1080",
+    "1080p-mp4": "height=1080,codec=avc1",
+    "720p": "height=720",
+    "compact": "height=1080,codec=avc1,size=500M,fallback=audio",
+    "saver": "height=480,size=200M,fallback=audio",
+    "audio": "audio",
+}
+SINGLE_DEFAULT_POLICY = "720p"
+SELECTOR_AUDIO_SHARE = 0.1
+
+def codec_family(codec):
+    codec = (codec or '').lower()
+    for family, pattern in CODEC_PATTERNS.items():
+        if re.match(pattern, codec):
+            return family
+    return codec.split('.')[0]
+
+def parse_size(text):
+    match = RATE_RE.match(text.strip().upper())
+    if not match:
+        raise ValueError
+    return int(float(match.group(1)) * RATE_UNITS[match.group(2)]) or None
+
+class FormatPolicy:
+    def __init__(self, max_height=None, codec=None, max_size=None, fallback=FALLBACK_BEST, audio_only=False):
+        self.max_height = max_height
+        self.codec = codec
+        self.max_size = max_size
+        self.fallback = fallback
+        self.audio_only = audio_only
+
+    def is_default(self):
+        return not (self.max_height or self.codec or self.max_size or self.audio_only)
+
+    def describe(self):
+        if self.audio_only:
+            return "فقط صدا"
+        parts = []
+        if self.max_height:
+            parts.append(f"حداکثر {self.max_height}p")
+        if self.codec:
+            parts.append(f"ترجیح {self.codec}")
+        if self.max_size:
+            parts.append(f"حداکثر {format_size(self.max_size)}")
+        if self.fallback == FALLBACK_AUDIO:
+            parts.append("در غیر این صورت فقط صدا")
+        return "، ".join(parts) or "بهترین کیفیت"
+
+    def fits(self, fmt, size):
+        if self.max_height and fmt['height'] > self.max_height:
+            return False
+        return not (self.max_size and size and size > self.max_size)
+
+    def pick_audio(self, info, container="mp4"):
+        preferred = CONTAINER_CODECS.get(container, ((), None))[1]
+        audio_formats = [
+            fmt for fmt in info.get('formats') or []
+            if fmt.get('vcodec') == 'none' and fmt.get('acodec') not in (None, 'none')
+        ]
+        return max(
+            audio_formats,
+            key=lambda fmt: (codec_family(fmt.get('acodec')) == preferred, fmt.get('abr') or fmt.get('tbr') or 0),
+            default=None,
+        )
+
+    def pick(self, info, container="mp4"):
+        audio_format = self.pick_audio(info, container)
+        if self.audio_only:
+            return (None, audio_format, format_filesize(audio_format)) if audio_format else None
+        merge_codecs = CONTAINER_CODECS.get(container, ((), None))[0]
+        candidates = []
+        for fmt in parse_video_formats(info):
+            size = estimate_download_size(fmt, audio_format)
+            if not self.fits(fmt, size):
+                continue
+            family = codec_family(fmt['vcodec'])
+            rank = (family == self.codec, fmt['height'], family in merge_codecs, fmt['fps'] or 0, size or 0)
+            candidates.append((rank, fmt, size))
+        if candidates:
+            _, fmt, size = max(candidates, key=lambda candidate: candidate[0])
+            return fmt, audio_format if fmt['acodec'] == 'none' else None, size
+        if self.fallback == FALLBACK_AUDIO and audio_format:
+            return None, audio_format, format_filesize(audio_format)
+        return None
+
+    def choice(self, info, container="mp4"):
+        picked = self.pick(info, container)
+        if picked is None:
+            if self.fallback == FALLBACK_BEST:
+                return None
+            return (f"خودکار ({self.describe()}): فرمت مناسبی یافت نشد", self.selector(container), None)
+        video_format, audio_format, size = picked
+        if video_format is None:
+            return (f"خودکار: فقط صدا ({audio_format['format_id']}) - {format_size(size)}", str(audio_format['format_id']), size)
+        spec = video_format['format_id']
+        if audio_format is not None:
+            spec += f"+{audio_format['format_id']}"
+        label = f"خودکار: {video_format['resolution']} {codec_family(video_format['vcodec'])} ({spec}) - {format_size(size)}"
+        return label, spec, size
+
+    def selector(self, container="mp4"):
+        if self.is_default():
+            return DEFAULT_FORMAT
+        audio_codec = CONTAINER_CODECS.get(container, ((), None))[1]
+        audio_filter = f"[acodec^={audio_codec}]" if audio_codec else ""
+        size_filter = video_size = audio_size = ""
+        if self.max_size:
+            audio_limit = int(self.max_size * SELECTOR_AUDIO_SHARE)
+            size_filter = f"[filesize<=?{self.max_size}][filesize_approx<=?{self.max_size}]"
+            video_size = f"[filesize<=?{self.max_size - audio_limit}][filesize_approx<=?{self.max_size - audio_limit}]"
+            audio_size = f"[filesize<=?{audio_limit}][filesize_approx<=?{audio_limit}]"
+        if self.audio_only:
+            return "/".join(dict.fromkeys([f"bestaudio{audio_filter}{size_filter}", f"bestaudio{size_filter}"]))
+        height = f"[height<=?{self.max_height}]" if self.max_height else ""
+        video, audio, combined = f"bestvideo{height}{video_size}", f"bestaudio{audio_size}", f"best{height}{size_filter}"
+        alternatives = []
+        if self.codec:
+            codec_filter = f"[vcodec~='{CODEC_PATTERNS[self.codec]}']"
+            alternatives += [f"{video}{codec_filter}+bestaudio{audio_filter}{audio_size}", f"{combined}{codec_filter}"]
+        alternatives += [f"{video}+bestaudio{audio_filter}{audio_size}", f"{video}+{audio}", combined]
+        if self.fallback == FALLBACK_AUDIO:
+            alternatives += [f"bestaudio{audio_filter}", "bestaudio"]
+        elif self.fallback == FALLBACK_BEST:
+            alternatives.append(DEFAULT_FORMAT)
+        return "/".join(dict.fromkeys(alternatives))
+
+def parse_format_policy(text):
+    text = (text or "").strip()
+    rules = FORMAT_POLICIES.get(text.lower(), text)
+    policy = FormatPolicy()
+    for rule in rules.split(','):
+        rule = rule.strip().lower()
+        if not rule:
+            continue
+        key, _, value = rule.partition('=')
+        key, value = key.strip(), value.strip()
+        try:
+            if key == "audio" and not value:
+                policy.audio_only = True
+            elif key == "height":
+                policy.max_height = int(value.rstrip('p'))
+            elif key == "codec" and value in CODEC_PATTERNS:
+                policy.codec = value
+            elif key == "size":
+                policy.max_size = parse_size(value)
+            elif key == "fallback" and value in FORMAT_FALLBACKS:
+                policy.fallback = value
+            else:
+                raise ValueError
+        except ValueError:
+            raise ValueError(
+                f"قانون انتخاب کیفیت نامعتبر است: {rule} (نمونه درست: height=1080,codec=avc1,size=500M,fallback=audio "
+                f"یا یکی از {', '.join(FORMAT_POLICIES)})"
+            )
+    return policy
+
+def quality_choices(info, policy=None):
+    formats = sorted(parse_video_formats(info), key=lambda fmt: (fmt['height'], fmt['fps'] or 0, fmt['size_bytes'] or 0))
+    audio_format = best_audio_format(info)
+    if formats:
+        best_label = f"بهترین کیفیت ({formats[-1]['resolution']})"
+        best_size = estimate_download_size(formats[-1], audio_format)
+    else:
+        best_label, best_size = "بهترین کیفیت", None
+    choices = [(best_label, DEFAULT_FORMAT, best_size)]
+    if policy is not None and not policy.is_default():
+        choice = policy.choice(info)
+        if choice is not None:
+            choices.insert(0, choice)
+    for fmt in reversed(formats):
+        size = estimate_download_size(fmt, audio_format)
+        choices.append((f"{fmt['resolution']} ({fmt['format_id']}) - {format_size(size)}", f"{fmt['format_id']}+bestaudio", size))
+    return choices
+
+def probe_many(urls, browser, cache, max_workers=4, on_result=None, on_failed=None, is_cancelled=None):
+    on_result = on_result or (lambda index, info: None)
+    on_failed = on_failed or (lambda index, message: None)
+    is_cancelled = is_cancelled or (lambda: False)
+
+    def probe_one(index):
+        if is_cancelled():
+            return
+        url = urls[index]
+        info = cache.get(url) if cache is not None else None
+        if info is None:
+            try:
+                info = probe_video(url, browser)
+            except ProbeError as e:
+                on_failed(index, str(e))
+                return
+            if cache is not None:
+                cache.put(url, info)
+        on_result(index, info)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        list(executor.map(probe_one, range(len(urls))))
+
+YTDLP_BIN = os.environ.get("UD_YTDLP", "yt-dlp")
+
+def launch_error(error):
+    return f"اجرای yt-dlp ممکن نشد ({YTDLP_BIN}). مطمئن شوید yt-dlp نصب شده و در PATH قرار دارد.\n{error}"
+
+PROGRESS_PREFIX = "UDPROGRESS "
+PROGRESS_TEMPLATE = (
+    "download:" + PROGRESS_PREFIX +
+    "%(progress.downloaded_bytes)s|%(progress.total_bytes)s|%(progress.total_bytes_estimate)s|"
+    "%(progress.speed)s|%(progress.eta)s"
+)
+
+ENGINE_INPROCESS = "inprocess"
+ENGINE_SUBPROCESS = "subprocess"
+
+ENGINE_LABELS = {
+    ENGINE_INPROCESS: "داخلی (کتابخانه yt_dlp)",
+    ENGINE_SUBPROCESS: "خط فرمان (yt-dlp)",
+}
+
+def make_progress(downloaded_bytes, total_bytes, speed, eta, percent=None):
+    if percent is None and downloaded_bytes is not None and total_bytes:
+        percent = downloaded_bytes * 100 / total_bytes
+    return {
+        'downloaded_bytes': downloaded_bytes,
+        'total_bytes': total_bytes,
+        'speed': speed,
+        'eta': eta,
+        'percent': min(percent, 100) if percent is not None else None,
+    }
+
+def parse_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_progress_line(line):
+    fields = line[len(PROGRESS_PREFIX):].split('|')
+    if len(fields) != 5:
+        return None
+    downloaded, total, estimate, speed, eta = (parse_number(field) for field in fields)
+    return make_progress(downloaded, total or estimate, speed, eta)
+
+def format_eta(seconds):
+    if seconds is None:
+        return '--:--'
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}:{minutes:02d}:{seconds:02d}' if hours else f'{minutes:02d}:{seconds:02d}'
+
+OUTPUT_PATH_PATTERNS = (
+    re.compile(r'^\[download\] Destination: (.+)$'),
+    re.compile(r'^\[Merger\] Merging formats into "(.+)"$'),
+    re.compile(r'^\[download\] (.+) has already been downloaded'),
+)
+
+DATE_FILTERED_RE = re.compile(r'^\[download\] .+ upload date is not in range ')
+
+def parse_output_path(line):
+    for pattern in OUTPUT_PATH_PATTERNS:
+        match = pattern.match(line)
+        if match:
+            return match.group(1)
+    return None
+
+class DownloadJob:
+    def __init__(self, url, format_spec, output_template, browser="None", merge_output_format="mp4",
+                 download_archive=None, concurrent_fragments=1, external_downloader=None, rate_limit=None,
+                 write_thumbnail=False):
+        self.url = url
+        self.format_spec = format_spec
+        self.output_template = output_template
+        self.browser = browser
+        self.merge_output_format = merge_output_format
+        self.download_archive = download_archive
+        self.concurrent_fragments = max(1, concurrent_fragments)
+        self.external_downloader = external_downloader
+        self.rate_limit = rate_limit
+        self.write_thumbnail = write_thumbnail
+        self.date_after = None
+        self.date_before = None
+        self.cookie_file = None
+        self.cookie_generation = None
+
+    def acquire_cookies(self):
+        cookies = shared_cookies(self.browser)
+        if cookies is not None:
+            self.cookie_file, self.cookie_generation = cookies.acquire()
+
+    def release_cookies(self):
+        if self.cookie_file:
+            remove_file(self.cookie_file)
+            self.cookie_file = None
+
+    def refresh_cookies(self):
+        cookies = shared_cookies(self.browser)
+        return cookies is not None and self.cookie_generation is not None and cookies.invalidate(self.cookie_generation)
+
+    def external_downloader_args(self):
+        if self.external_downloader != "aria2c":
+            return []
+        connections = str(min(self.concurrent_fragments, 16))
+        return ["-x", connections, "-s", connections, "-k", "1M"]
+
+    def command_args(self):
+        args = ["--newline", "--progress-template", PROGRESS_TEMPLATE, "--continue", "--no-playlist"]
+        args += cookie_args(self.browser, self.cookie_file)
+        if self.download_archive:
+            args += ["--download-archive", self.download_archive]
+        if self.rate_limit:
+            args += ["--limit-rate", str(int(self.rate_limit))]
+        if self.write_thumbnail:
+            args += ["--write-thumbnail"]
+        if self.date_after:
+            args += ["--dateafter", self.date_after]
+        if self.date_before:
+            args += ["--datebefore", self.date_before]
+        if self.concurrent_fragments > 1:
+            args += ["--concurrent-fragments", str(self.concurrent_fragments)]
+        if self.external_downloader:
+            args += ["--downloader", self.external_downloader]
+            downloader_args = self.external_downloader_args()
+            if downloader_args:
+                args += ["--downloader-args", f"{self.external_downloader}:{' '.join(downloader_args)}"]
+        args += ["-f", self.format_spec]
+        if self.merge_output_format:
+            args += ["--merge-output-format", self.merge_output_format]
+        args += ["-o", self.output_template, "--", self.url]
+        return args
+
+    def ydl_options(self):
+        options = {'format': self.format_spec, 'outtmpl': self.output_template, 'continuedl': True, 'noplaylist': True}
+        if self.cookie_file:
+            options['cookiefile'] = self.cookie_file
+        elif normalize_browser(self.browser):
+            options['cookiesfrombrowser'] = (normalize_browser(self.browser),)
+        if self.download_archive:
+            options['download_archive'] = self.download_archive
+        if self.rate_limit:
+            options['ratelimit'] = int(self.rate_limit)
+        if self.write_thumbnail:
+            options['writethumbnail'] = True
+        if self.date_after or self.date_before:
+            from yt_dlp.utils import DateRange
+            options['daterange'] = DateRange(self.date_after, self.date_before)
+        if self.concurrent_fragments > 1:
+            options['concurrent_fragment_downloads'] = self.concurrent_fragments
+        if self.external_downloader:
+            options['external_downloader'] = {'default': self.external_downloader}
+            options['external_downloader_args'] = {self.external_downloader: self.external_downloader_args()}
+        if self.merge_output_format:
+            options['merge_output_format'] = self.merge_output_format
+        return options
+
+class DownloadCancelled(Exception):
+    pass
+
+class SubprocessEngine:
+    live_rate_limit = False
+
+    def __init__(self):
+        self.process = None
+        self.cancelled = False
+
+    def download(self, job, on_progress, on_message):
+        creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+        try:
+            self.process = subprocess.Popen(
+                [YTDLP_BIN, *job.command_args()], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                text=True, errors="replace", creationflags=creationflags
+            )
+        except OSError as e:
+            return False, launch_error(e)
+        errors = []
+        tail = deque(maxlen=20)
+        for line in self.process.stdout:
+            line = line.strip()
+            if line.startswith(PROGRESS_PREFIX):
+                progress = parse_progress_line(line)
+                if progress:
+                    on_progress(progress)
+                continue
+            percent = re.search(r'(\d+\.\d+)%|(\d+)%', line)
+            if percent:
+                on_progress(make_progress(None, None, None, None, float(percent.group(1) or percent.group(2))))
+            if line.startswith("ERROR"):
+                errors.append(line)
+            tail.append(line)
+            on_message(line)
+        self.process.wait()
+        if self.process.returncode == 0:
+            return True, ""
+        if self.cancelled:
+            return False, "دانلود توسط کاربر متوقف شد."
+        return False, "\n".join(errors or tail)
+
+    def cancel(self):
+        self.cancelled = True
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+
+    def set_rate_limit(self, rate_limit):
+        pass
+
+class EngineLogger:
+    def __init__(self, on_message):
+        self.on_message = on_message
+        self.errors = []
+
+    def debug(self, message):
+        if not message.startswith('[debug] '):
+            self.on_message(message)
+
+    def info(self, message):
+        self.on_message(message)
+
+    def warning(self, message):
+        self.on_message(f"WARNING: {message}")
+
+    def error(self, message):
+        self.errors.append(message)
+        self.on_message(message)
+
+class InProcessEngine:
+    live_rate_limit = True
+
+    def __init__(self):
+        self.cancelled = False
+        self.ydl = None
+
+    def download(self, job, on_progress, on_message):
+        def progress_hook(status):
+            if self.cancelled:
+                raise DownloadCancelled()
+            if status['status'] == 'downloading':
+                on_progress(make_progress(
+                    status.get('downloaded_bytes'),
+                    status.get('total_bytes') or status.get('total_bytes_estimate'),
+                    status.get('speed'),
+                    status.get('eta'),
+                ))
+
+        import yt_dlp
+
+        logger = EngineLogger(on_message)
+        options = job.ydl_options()
+        options.update({'logger': logger, 'progress_hooks': [progress_hook], 'noprogress': True})
+        try:
+            with yt_dlp.YoutubeDL(options) as ydl:
+                self.ydl = ydl
+                retcode = ydl.download([job.url])
+        except DownloadCancelled:
+            return False, "دانلود توسط کاربر متوقف شد."
+        except Exception as e:
+            return False, "\n".join(logger.errors) or str(e)
+        if retcode:
+            return False, "\n".join(logger.errors)
+        return True, ""
+
+    def cancel(self):
+        self.cancelled = True
+
+    def set_rate_limit(self, rate_limit):
+        if self.ydl is not None:
+            self.ydl.params['ratelimit'] = int(rate_limit) if rate_limit else None
+
+def create_engine(engine_name):
+    if engine_name == ENGINE_INPROCESS and YT_DLP_AVAILABLE:
+        return InProcessEngine()
+    return SubprocessEngine()
+
+def ignore(*args):
+    pass
+
+PHASE_PROBE = "probe"
+PHASE_DOWNLOAD = "download"
+PHASE_MERGE = "merge"
+PHASE_POSTPROCESS = "postprocess"
+
+PHASES = (PHASE_PROBE, PHASE_DOWNLOAD, PHASE_MERGE, PHASE_POSTPROCESS)
+
+PHASE_LABELS = {
+    PHASE_PROBE: "استخراج اطلاعات",
+    PHASE_DOWNLOAD: "دانلود",
+    PHASE_MERGE: "ترکیب",
+    PHASE_POSTPROCESS: "پردازش نهایی",
+}
+
+POSTPROCESS_LINE_RE = re.compile(
+    r'^\[(?:ExtractAudio|Fixup\w*|Embed\w*|Metadata|VideoConvertor|VideoRemuxer|ModifyChapters|SponsorBlock|'
+    r'ThumbnailsConvertor|SplitChapters|MoveFiles|FFmpeg\w*)\]'
+)
+
+def phase_for_line(line):
+    if line.startswith("[download] Destination:"):
+        return PHASE_DOWNLOAD
+    if line.startswith("[Merger]"):
+        return PHASE_MERGE
+    if POSTPROCESS_LINE_RE.match(line):
+        return PHASE_POSTPROCESS
+    return None
+
+class JobMetrics:
+    def __init__(self):
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.phase = None
+        self.phase_started = None
+        self.bytes = 0
+        self.file_bytes = 0
+        self.peak_speed = 0
+
+    def enter(self, phase):
+        now = time.monotonic()
+        if self.phase is not None:
+            self.phases[self.phase] += now - self.phase_started
+        self.phase = phase
+        self.phase_started = now
+
+    def on_line(self, line):
+        phase = phase_for_line(line)
+        if phase is not None and phase != self.phase:
+            self.enter(phase)
+
+    def on_progress(self, progress):
+        if self.phase == PHASE_PROBE:
+            self.enter(PHASE_DOWNLOAD)
+        downloaded = progress['downloaded_bytes']
+        if downloaded is not None:
+            if downloaded < self.file_bytes:
+                self.bytes += self.file_bytes
+            self.file_bytes = int(downloaded)
+        if progress['speed']:
+            self.peak_speed = max(self.peak_speed, progress['speed'])
+
+    def finish(self):
+        self.enter(None)
+        self.bytes += self.file_bytes
+        self.file_bytes = 0
+
+    def wall_time(self):
+        return sum(self.phases.values())
+
+class DownloadTask:
+    STATS_INTERVAL = 0.5
+
+    def __init__(self, job, engine_name=ENGINE_INPROCESS, on_progress=ignore, on_stats=ignore,
+                 on_message=ignore, on_output_path=ignore, metrics=None):
+        self.job = job
+        self.engine = create_engine(engine_name)
+        self.metrics = metrics or JobMetrics()
+        self.on_progress = on_progress
+        self.on_stats = on_stats
+        self.on_message = on_message
+        self.on_output_path = on_output_path
+        self.job_cap = job.rate_limit
+        self.error = ""
+        self.filtered = False
+        self.last_percent = -1
+        self.last_stats_time = 0
+
+    def run(self):
+        self.metrics.enter(PHASE_PROBE)
+        try:
+            self.job.acquire_cookies()
+            success, self.error = self.engine.download(self.job, self.on_engine_progress, self.on_engine_message)
+        except OSError as e:
+            success, self.error = False, str(e)
+        finally:
+            self.job.release_cookies()
+        self.metrics.finish()
+        if success and self.filtered:
+            self.on_message("تاریخ انتشار ویدیو خارج از بازه انتخاب‌شده است؛ دانلود نشد.")
+        elif success:
+            self.on_message("دانلود با موفقیت انجام شد!")
+            self.on_progress(100)
+        else:
+            self.on_message(f"خطا در دانلود: {self.error}")
+            self.on_progress(0)
+        return success
+
+    def on_engine_message(self, line):
+        self.metrics.on_line(line)
+        path = parse_output_path(line)
+        if path:
+            self.on_output_path(path)
+        elif DATE_FILTERED_RE.match(line):
+            self.filtered = True
+        self.on_message(line)
+
+    def on_engine_progress(self, progress):
+        self.metrics.on_progress(progress)
+        now = time.monotonic()
+        if now - self.last_stats_time >= self.STATS_INTERVAL:
+            self.last_stats_time = now
+            self.on_stats(progress)
+        if progress['percent'] is not None and int(progress['percent']) != self.last_percent:
+            self.last_percent = int(progress['percent'])
+            self.on_progress(self.last_percent)
+
+    def stop(self):
+        self.engine.cancel()
+
+    @property
+    def cancelled(self):
+        return self.engine.cancelled
+
+    @property
+    def live_rate_limit(self):
+        return self.engine.live_rate_limit
+
+    def set_rate_limit(self, rate_limit):
+        self.job.rate_limit = rate_limit
+        self.engine.set_rate_limit(rate_limit)
+
+RATE_RE = re.compile(r'^(\d+(?:\.\d+)?)\s*([KMG]?)(?:I?B)?(?:/S)?$')
+RATE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+MIN_SHARED_RATE = 16 * 1024
+
+def parse_rate(text):
+    text = text.strip().upper()
+    if not text:
+        return None
+    match = RATE_RE.match(text)
+    if not match:
+        raise ValueError(f"مقدار سرعت نامعتبر است: {text}")
+    rate = int(float(match.group(1)) * RATE_UNITS[match.group(2)])
+    return rate or None
+
+def parse_clock(text):
+    hours, _, minutes = text.strip().partition(':')
+    hours, minutes = int(hours), int(minutes or 0)
+    if not (0 <= hours <= 24 and 0 <= minutes < 60):
+        raise ValueError
+    return hours * 60 + minutes
+
+def parse_schedule(text):
+    windows = []
+    for entry in re.split(r'[;\n]', text):
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            span, rate = entry.split('=')
+            start, end = span.split('-')
+            windows.append((parse_clock(start), parse_clock(end), parse_rate(rate)))
+        except ValueError:
+            raise ValueError(f"بازه زمانی نامعتبر است: {entry} (نمونه درست: 08:00-17:00=2M)")
+    return windows
+
+class BandwidthManager:
+    def __init__(self, global_limit=None, job_limit=None, schedule=None):
+        self.global_limit = global_limit
+        self.job_limit = job_limit
+        self.schedule = schedule or []
+
+    def current_global_limit(self, now=None):
+        now = now or datetime.datetime.now()
+        minute = now.hour * 60 + now.minute
+        for start, end, limit in self.schedule:
+            inside = start <= minute < end if start <= end else minute >= start or minute < end
+            if inside:
+                return limit
+        return self.global_limit
+
+    def job_rate(self, active_jobs, job_limit=None, now=None, reserved=0):
+        limits = []
+        if job_limit or self.job_limit:
+            limits.append(job_limit or self.job_limit)
+        global_limit = self.current_global_limit(now)
+        if global_limit:
+            limits.append(max((global_limit - reserved) // max(active_jobs, 1), MIN_SHARED_RATE))
+        return min(limits) if limits else None
+
+ITEM_QUEUED = "queued"
+ITEM_RUNNING = "running"
+ITEM_DONE = "done"
+ITEM_FAILED = "failed"
+ITEM_WAITING = "waiting"
+ITEM_POSTPROCESSING = "postprocessing"
+ITEM_FILTERED = "filtered"
+
+ITEM_STATUS_LABELS = {
+    ITEM_QUEUED: "در صف",
+    ITEM_RUNNING: "در حال دانلود",
+    ITEM_DONE: "انجام شد",
+    ITEM_FAILED: "ناموفق",
+    ITEM_WAITING: "در انتظار تلاش دوباره",
+    ITEM_POSTPROCESSING: "در حال پردازش",
+    ITEM_FILTERED: "خارج از بازه تاریخ",
+}
+
+class BatchItem:
+    def __init__(self, url, format_spec=None, title=None):
+        self.url = url
+        self.format_spec = format_spec
+        self.title = title
+        self.status = ITEM_QUEUED
+        self.progress = 0
+        self.speed = None
+        self.eta = None
+        self.output_path = None
+        self.attempts = 0
+        self.failure = None
+        self.error = ""
+        self.skipped = False
+        self.redownload = False
+        self.date_after = None
+        self.date_before = None
+        self.metrics = JobMetrics()
+
+class QueueStore:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(user_data_dir(), "queue.sqlite3")
+        self.lock = threading.Lock()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS queue_items ("
+                "position INTEGER PRIMARY KEY, url TEXT NOT NULL, format_spec TEXT, "
+                "status TEXT NOT NULL, output_path TEXT, updated REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE TABLE IF NOT EXISTS queue_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(queue_items)")}
+            for column in ("failure", "error", "date_after", "date_before"):
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE queue_items ADD COLUMN {column} TEXT")
+            self.conn.commit()
+        except (OSError, sqlite3.Error):
+            self.conn = None
+
+    def save_batch(self, items, options):
+        if self.conn is None:
+            return
+        now = time.time()
+        with self.lock:
+            self.conn.execute("DELETE FROM queue_items")
+            self.conn.executemany(
+                "INSERT INTO queue_items (position, url, format_spec, status, output_path, date_after, date_before, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (index, item.url, item.format_spec, item.status, item.output_path, item.date_after, item.date_before, now)
+                    for index, item in enumerate(items)
+                ]
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO queue_meta (key, value) VALUES ('options', ?)", (json.dumps(options),)
+            )
+            self.conn.commit()
+
+    def append_items(self, start, items):
+        if self.conn is None:
+            return
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO queue_items (position, url, format_spec, status, output_path, date_after, date_before, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (start + offset, item.url, item.format_spec, item.status, item.output_path, item.date_after,
+                     item.date_before, now)
+                    for offset, item in enumerate(items)
+                ]
+            )
+            self.conn.commit()
+
+    def update_item(self, index, item):
+        self.update_items([(index, item)])
+
+    def update_items(self, indexed_items):
+        if self.conn is None:
+            return
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "UPDATE queue_items SET status = ?, output_path = ?, failure = ?, error = ?, updated = ? WHERE position = ?",
+                [(item.status, item.output_path, item.failure, item.error, now, index) for index, item in indexed_items]
+            )
+            self.conn.commit()
+
+    def load(self):
+        if self.conn is None:
+            return [], {}
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT url, format_spec, status, output_path, failure, error, date_after, date_before "
+                "FROM queue_items ORDER BY position"
+            ).fetchall()
+            meta = self.conn.execute("SELECT value FROM queue_meta WHERE key = 'options'").fetchone()
+        items = []
+        for url, format_spec, status, output_path, failure, error, date_after, date_before in rows:
+            item = BatchItem(url, format_spec)
+            item.status = status
+            item.output_path = output_path
+            item.failure = failure
+            item.error = error or ""
+            item.date_after = date_after
+            item.date_before = date_before
+            items.append(item)
+        return items, json.loads(meta[0]) if meta else {}
+
+    def pending_count(self):
+        if self.conn is None:
+            return 0
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM queue_items WHERE status NOT IN (?, ?)", (ITEM_DONE, ITEM_FILTERED)
+            ).fetchone()[0]
+
+    def clear(self):
+        if self.conn is None:
+            return
+        with self.lock:
+            self.conn.execute("DELETE FROM queue_items")
+            self.conn.execute("DELETE FROM queue_meta")
+            self.conn.commit()
+
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.webm', '.avi', '.mov')
+
+STREAM_COPY_CONTAINERS = {
+    'aac': '.m4a',
+    'alac': '.m4a',
+    'opus': '.opus',
+    'mp3': '.mp3',
+    'vorbis': '.ogg',
+    'flac': '.flac',
+}
+
+def find_video_files(folder, extensions=VIDEO_EXTENSIONS):
+    video_files = []
+    for root, _, files in os.walk(folder):
+        for name in sorted(files):
+            if name.lower().endswith(extensions):
+                video_files.append(os.path.join(root, name))
+    return video_files
+
+def probe_audio_stream(path):
+    creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    command = [
+        "ffprobe", "-v", "error", "-select_streams", "a:0",
+        "-show_entries", "stream=codec_name:format=duration", "-of", "json", path,
+    ]
+    result = subprocess.run(command, capture_output=True, text=True, errors="replace", creationflags=creationflags)
+    if result.returncode != 0:
+        raise ProbeError(result.stderr.strip())
+    data = json.loads(result.stdout or "{}")
+    streams = data.get('streams') or []
+    duration = parse_number((data.get('format') or {}).get('duration'))
+    return (streams[0].get('codec_name') if streams else None), duration
+
+def audio_extraction_plan(video_file, codec, force_mp3=False):
+    base = os.path.splitext(video_file)[0]
+    extension = None if force_mp3 else STREAM_COPY_CONTAINERS.get(codec)
+    if extension:
+        codec_args, label = ["-c:a", "copy"], f"کپی {codec} → {extension[1:]}"
+    else:
+        extension, codec_args, label = '.mp3', ["-c:a", "libmp3lame", "-b:a", "320k"], "تبدیل به mp3"
+    audio_file = base + extension
+    if os.path.normcase(os.path.abspath(audio_file)) == os.path.normcase(os.path.abspath(video_file)):
+        audio_file = f"{base}.audio{extension}"
+    return audio_file, codec_args, label
+
+def extract_audio(video_file, force_mp3=False, has_ffprobe=True, on_planned=ignore, on_progress=ignore):
+    codec, duration = None, None
+    if has_ffprobe:
+        try:
+            codec, duration = probe_audio_stream(video_file)
+        except (ProbeError, json.JSONDecodeError) as e:
+            return False, f'خطا در بررسی فایل: {e}'
+        if codec is None:
+            return False, 'فایل انتخاب‌شده جریان صوتی (Audio Stream) ندارد!'
+
+    audio_file, codec_args, label = audio_extraction_plan(video_file, codec, force_mp3)
+    on_planned(label)
+
+    creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    command = [
+        "ffmpeg", "-hide_banner", "-nostdin", "-y", "-i", video_file, "-vn", *codec_args,
+        "-progress", "pipe:1", "-nostats", audio_file,
+    ]
+    process = subprocess.Popen(
+        command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors="replace",
+        creationflags=creationflags
+    )
+    stderr_tail = deque(maxlen=20)
+    stderr_reader = threading.Thread(target=lambda: stderr_tail.extend(process.stderr), daemon=True)
+    stderr_reader.start()
+    last_percent = -1
+    for line in process.stdout:
+        key, _, value = line.strip().partition('=')
+        if key == 'out_time_us' and duration:
+            microseconds = parse_number(value)
+            percent = min(int(microseconds / 10000 / duration), 99) if microseconds else 0
+            if percent != last_percent:
+                last_percent = percent
+                on_progress(percent)
+    process.wait()
+    stderr_reader.join()
+
+    if process.returncode == 0:
+        on_progress(100)
+        return True, audio_file
+    error_output = ''.join(stderr_tail)
+    error_message = f'خطا در استخراج صدا: {error_output}'
+    if not has_ffprobe and "Audio:" not in error_output:
+        error_message += '\n\nفایل انتخاب‌شده جریان صوتی (Audio Stream) ندارد!'
+    return False, error_message
+
+def extract_audio_many(video_files, force_mp3=False, max_workers=None, on_planned=ignore, on_progress=ignore,
+                       on_finished=ignore, on_error=ignore):
+    has_ffprobe = shutil.which("ffprobe") is not None
+
+    def extract_one(index):
+        success, result = extract_audio(
+            video_files[index], force_mp3, has_ffprobe,
+            on_planned=lambda label: on_planned(index, label),
+            on_progress=lambda percent: on_progress(index, percent),
+        )
+        if success:
+            on_finished(index, result)
+        else:
+            on_error(index, result)
+        return success
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1) as executor:
+        return list(executor.map(extract_one, range(len(video_files))))
+
+POSTPROCESS_REMUX = "remux"
+POSTPROCESS_NORMALIZE = "normalize"
+POSTPROCESS_METADATA = "metadata"
+POSTPROCESS_THUMBNAIL = "thumbnail"
+POSTPROCESS_AUDIO = "audio"
+POSTPROCESS_MP3 = "mp3"
+
+POSTPROCESS_STEPS = (
+    POSTPROCESS_REMUX, POSTPROCESS_NORMALIZE, POSTPROCESS_METADATA, POSTPROCESS_THUMBNAIL, POSTPROCESS_AUDIO,
+    POSTPROCESS_MP3,
+)
+
+POSTPROCESS_LABELS = {
+    POSTPROCESS_REMUX: "تبدیل ظرف به MKV",
+    POSTPROCESS_NORMALIZE: "یکسان‌سازی بلندی صدا",
+    POSTPROCESS_METADATA: "افزودن عنوان و لینک",
+    POSTPROCESS_THUMBNAIL: "افزودن تصویر ویدیو",
+    POSTPROCESS_AUDIO: "استخراج صدا",
+    POSTPROCESS_MP3: "استخراج صدا به MP3",
+}
+
+THUMBNAIL_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+ATTACHED_PIC_CONTAINERS = ('.mp4', '.m4a', '.mov')
+ATTACHMENT_CONTAINERS = ('.mkv',)
+LOUDNORM_FILTER = "loudnorm=I=-16:TP=-1.5:LRA=11"
+NORMALIZE_ENCODERS = {
+    '.webm': ["-c:a", "libopus", "-b:a", "160k"],
+    '.opus': ["-c:a", "libopus", "-b:a", "160k"],
+    '.ogg': ["-c:a", "libvorbis", "-q:a", "6"],
+    '.mp3': ["-c:a", "libmp3lame", "-b:a", "320k"],
+}
+DEFAULT_NORMALIZE_ENCODER = ["-c:a", "aac", "-b:a", "192k"]
+
+class PostProcessError(Exception):
+    pass
+
+def parse_postprocess_steps(text):
+    steps = [step.strip().lower() for step in (text or "").split(',') if step.strip()]
+    unknown = [step for step in steps if step not in POSTPROCESS_STEPS]
+    if unknown:
+        raise ValueError(f"مرحله پردازش نامعتبر است: {', '.join(unknown)} (مجاز: {', '.join(POSTPROCESS_STEPS)})")
+    return [step for step in POSTPROCESS_STEPS if step in steps]
+
+def run_ffmpeg(target, args):
+    creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-nostdin", "-y", *args, target], capture_output=True, text=True, errors="replace",
+        creationflags=creationflags
+    )
+    if result.returncode != 0:
+        remove_file(target)
+        raise PostProcessError("\n".join(result.stderr.strip().splitlines()[-5:]))
+
+def rewrite_media(path, args):
+    base, extension = os.path.splitext(path)
+    temp_path = f"{base}.temp{extension}"
+    run_ffmpeg(temp_path, args)
+    os.replace(temp_path, path)
+    return path
+
+def count_video_streams(path):
+    if not shutil.which("ffprobe"):
+        return 1
+    creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "v", "-show_entries", "stream=index", "-of", "csv=p=0", path],
+        capture_output=True, text=True, errors="replace", creationflags=creationflags
+    )
+    return len(result.stdout.split())
+
+def find_thumbnail(path):
+    base = os.path.splitext(path)[0]
+    for extension in THUMBNAIL_EXTENSIONS:
+        if os.path.exists(base + extension):
+            return base + extension
+    return None
+
+def remux_media(path, title, url, on_message):
+    base, extension = os.path.splitext(path)
+    if extension.lower() == '.mkv':
+        return path
+    target = base + '.mkv'
+    run_ffmpeg(target, ["-i", path, "-map", "0", "-c", "copy"])
+    os.remove(path)
+    return target
+
+def normalize_loudness(path, title, url, on_message):
+    encoder = NORMALIZE_ENCODERS.get(os.path.splitext(path)[1].lower(), DEFAULT_NORMALIZE_ENCODER)
+    return rewrite_media(path, ["-i", path, "-map", "0", "-c", "copy", "-af", LOUDNORM_FILTER, *encoder])
+
+def embed_metadata(path, title, url, on_message):
+    return rewrite_media(path, ["-i", path, "-map", "0", "-c", "copy", "-metadata", f"title={title}",
+                                "-metadata", f"comment={url}"])
+
+def embed_thumbnail(path, title, url, on_message):
+    thumbnail = find_thumbnail(path)
+    extension = os.path.splitext(path)[1].lower()
+    if thumbnail is None:
+        on_message("تصویر ویدیو دانلود نشده است؛ این مرحله رد شد.")
+        return path
+    if extension not in ATTACHED_PIC_CONTAINERS + ATTACHMENT_CONTAINERS:
+        on_message(f"افزودن تصویر به فایل {extension} پشتیبانی نمی‌شود؛ این مرحله رد شد.")
+        return path
+    if thumbnail.lower().endswith('.webp'):
+        converted = os.path.splitext(thumbnail)[0] + '.jpg'
+        run_ffmpeg(converted, ["-i", thumbnail])
+        os.remove(thumbnail)
+        thumbnail = converted
+    if extension in ATTACHMENT_CONTAINERS:
+        mimetype = "image/png" if thumbnail.lower().endswith('.png') else "image/jpeg"
+        rewrite_media(path, [
+            "-i", path, "-map", "0", "-c", "copy", "-attach", thumbnail,
+            "-metadata:s:t", f"mimetype={mimetype}", "-metadata:s:t", f"filename=cover{os.path.splitext(thumbnail)[1]}",
+        ])
+    else:
+        rewrite_media(path, [
+            "-i", path, "-i", thumbnail, "-map", "0", "-map", "1", "-c", "copy",
+            f"-disposition:v:{count_video_streams(path)}", "attached_pic",
+        ])
+    os.remove(thumbnail)
+    return path
+
+def audio_extractor(force_mp3):
+    def extract(path, title, url, on_message):
+        success, result = extract_audio(path, force_mp3, shutil.which("ffprobe") is not None, on_planned=on_message)
+        if not success:
+            raise PostProcessError(result)
+        on_message(f"فایل صوتی ذخیره شد: {result}")
+        return path
+    return extract
+
+POSTPROCESS_ACTIONS = {
+    POSTPROCESS_REMUX: remux_media,
+    POSTPROCESS_NORMALIZE: normalize_loudness,
+    POSTPROCESS_METADATA: embed_metadata,
+    POSTPROCESS_THUMBNAIL: embed_thumbnail,
+    POSTPROCESS_AUDIO: audio_extractor(False),
+    POSTPROCESS_MP3: audio_extractor(True),
+}
+
+class PostProcessor:
+    def __init__(self, steps, max_workers=None):
+        self.steps = [step for step in POSTPROCESS_STEPS if step in steps]
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1)
+
+    def submit(self, path, title, url, metrics=None, on_message=ignore, on_finished=ignore):
+        return self.executor.submit(self.run, path, title, url, metrics or JobMetrics(), on_message, on_finished)
+
+    def run(self, path, title, url, metrics, on_message, on_finished):
+        if not path or not os.path.exists(path):
+            on_message("مسیر فایل دانلودشده مشخص نیست؛ پردازش پس از دانلود انجام نشد.")
+            on_finished(True, path, "")
+            return
+        metrics.enter(PHASE_POSTPROCESS)
+        error = ""
+        title = title or os.path.splitext(os.path.basename(path))[0]
+        try:
+            for step in self.steps:
+                on_message(f"{POSTPROCESS_LABELS[step]}: {os.path.basename(path)}")
+                path = POSTPROCESS_ACTIONS[step](path, title, url, on_message)
+        except Exception as e:
+            error = f"خطا در پردازش پس از دانلود: {str(e) or type(e).__name__}"
+        finally:
+            metrics.enter(None)
+        on_finished(not error, path, error)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+MEDIA_EXTENSIONS = VIDEO_EXTENSIONS + ('.m4a', '.mp3', '.opus', '.ogg', '.flac', '.wav')
+FINGERPRINT_CHUNK = 1024 * 1024
+FILENAME_ID_RE = re.compile(r'\[([0-9A-Za-z_-]{11})\]')
+
+def file_fingerprint(path):
+    size = os.path.getsize(path)
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_CHUNK))
+        if size > 2 * FINGERPRINT_CHUNK:
+            f.seek(-FINGERPRINT_CHUNK, os.SEEK_END)
+            digest.update(f.read(FINGERPRINT_CHUNK))
+    return size, digest.hexdigest()
+
+def normalized_path(path):
+    return os.path.normcase(os.path.abspath(path))
+
+def is_inside(path, folder):
+    try:
+        return os.path.commonpath([normalized_path(folder), normalized_path(path)]) == normalized_path(folder)
+    except ValueError:
+        return False
+
+class DownloadIndex:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(user_data_dir(), "download-index.sqlite3")
+        self.lock = threading.Lock()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS downloads ("
+                "key TEXT PRIMARY KEY, video_id TEXT, format_spec TEXT, path TEXT, size INTEGER, "
+                "hash TEXT, completed REAL NOT NULL)"
+            )
+            self.conn.commit()
+        except (OSError, sqlite3.Error):
+            self.conn = None
+
+    def get(self, url):
+        if self.conn is None:
+            return None
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT video_id, format_spec, path, size, hash FROM downloads WHERE key = ?", (canonical_video_key(url),)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('video_id', 'format_spec', 'path', 'size', 'hash'), row))
+
+    def is_current(self, entry, format_spec=None):
+        path = entry['path']
+        try:
+            if not path or not os.path.isfile(path):
+                return False
+            if entry['size'] is not None and os.path.getsize(path) != entry['size']:
+                return False
+        except OSError:
+            return False
+        return not format_spec or not entry['format_spec'] or format_spec == entry['format_spec']
+
+    def record(self, url, format_spec, path):
+        if self.conn is None or not path or not os.path.isfile(path):
+            return
+        key = canonical_video_key(url)
+        try:
+            size, digest = file_fingerprint(path)
+        except OSError:
+            size = digest = None
+        video_id = key.split(':', 1)[1] if key.startswith('youtube:') else None
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO downloads (key, video_id, format_spec, path, size, hash, completed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, video_id, format_spec, path, size, digest, time.time())
+            )
+            self.conn.commit()
+
+    def count(self):
+        if self.conn is None:
+            return 0
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM downloads").fetchone()[0]
+
+    def clear(self):
+        if self.conn is None:
+            return
+        with self.lock:
+            self.conn.execute("DELETE FROM downloads")
+            self.conn.commit()
+
+    def rebuild(self, folder):
+        if self.conn is None:
+            return 0, 0, 0
+        with self.lock:
+            rows = self.conn.execute("SELECT key, path, hash FROM downloads").fetchall()
+        files = find_video_files(folder, MEDIA_EXTENSIONS)
+        indexed = {normalized_path(path) for _, path, _ in rows if path and os.path.isfile(path)}
+        unindexed = [path for path in files if normalized_path(path) not in indexed]
+        missing = [(key, path, digest) for key, path, digest in rows if path and not os.path.isfile(path)]
+
+        fingerprints = {}
+        for path in unindexed:
+            try:
+                fingerprints[path] = file_fingerprint(path)
+            except OSError:
+                continue
+        by_hash = {digest: path for path, (_, digest) in fingerprints.items()}
+
+        moved, removed, added = [], [], []
+        for key, path, digest in missing:
+            new_path = by_hash.pop(digest, None) if digest else None
+            if new_path:
+                moved.append((new_path, key))
+            elif is_inside(path, folder):
+                removed.append((key,))
+        removed += [(key,) for key, path, _ in rows if not path]
+        known_keys = {key for key, _, _ in rows}
+        matched = {path for path, _ in moved}
+        now = time.time()
+        for path, (size, digest) in fingerprints.items():
+            match = FILENAME_ID_RE.search(os.path.basename(path))
+            if path in matched or not match or f'youtube:{match.group(1)}' in known_keys:
+                continue
+            known_keys.add(f'youtube:{match.group(1)}')
+            added.append((f'youtube:{match.group(1)}', match.group(1), None, path, size, digest, now))
+
+        with self.lock:
+            self.conn.executemany("UPDATE downloads SET path = ? WHERE key = ?", moved)
+            self.conn.executemany("DELETE FROM downloads WHERE key = ?", removed)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO downloads (key, video_id, format_spec, path, size, hash, completed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", added
+            )
+            self.conn.commit()
+        return len(added), len(moved), len(removed)
+
+    def stats_text(self):
+        return f"فهرست دانلودهای قبلی: {self.count()} ویدیو"
+
+REPORT_FIELDS = (
+    "url", "title", "status", "failure", "attempts", "retries", "skipped", "probe_seconds", "download_seconds",
+    "merge_seconds", "postprocess_seconds", "wall_seconds", "bytes", "average_speed", "peak_speed", "output_path",
+)
+
+def job_report(item):
+    metrics = item.metrics
+    download_seconds = metrics.phases[PHASE_DOWNLOAD]
+    return {
+        "url": item.url,
+        "title": item.title,
+        "status": item.status,
+        "failure": item.failure,
+        "attempts": item.attempts,
+        "retries": max(item.attempts - 1, 0),
+        "skipped": item.skipped,
+        **{f"{phase}_seconds": round(metrics.phases[phase], 3) for phase in PHASES},
+        "wall_seconds": round(metrics.wall_time(), 3),
+        "bytes": metrics.bytes,
+        "average_speed": round(metrics.bytes / download_seconds) if download_seconds else None,
+        "peak_speed": round(metrics.peak_speed) or None,
+        "output_path": item.output_path,
+    }
+
+def summarize_jobs(jobs, elapsed):
+    total_bytes = sum(job["bytes"] for job in jobs)
+    return {
+        "jobs": len(jobs),
+        "done": sum(job["status"] == ITEM_DONE for job in jobs),
+        "failed": sum(job["status"] == ITEM_FAILED for job in jobs),
+        "filtered": sum(job["status"] == ITEM_FILTERED for job in jobs),
+        "skipped": sum(job["skipped"] for job in jobs),
+        "retries": sum(job["retries"] for job in jobs),
+        "elapsed_seconds": round(elapsed, 3),
+        "phase_seconds": {phase: round(sum(job[f"{phase}_seconds"] for job in jobs), 3) for phase in PHASES},
+        "bytes": total_bytes,
+        "throughput": round(total_bytes / elapsed) if elapsed else None,
+        "peak_speed": max((job["peak_speed"] or 0 for job in jobs), default=0) or None,
+    }
+
+def report_summary_text(summary):
+    busy = sum(summary["phase_seconds"].values())
+    phases = " | ".join(
+        f"{PHASE_LABELS[phase]}: {seconds:.1f}s ({seconds * 100 / busy:.0f}٪)" if busy else f"{PHASE_LABELS[phase]}: 0s"
+        for phase, seconds in summary["phase_seconds"].items()
+    )
+    return (
+        f"گزارش عملکرد: {summary['jobs']} مورد در {summary['elapsed_seconds']:.1f} ثانیه | "
+        f"حجم دانلود: {format_size(summary['bytes'])} | میانگین سرعت کل: {format_size(summary['throughput'])}/s | "
+        f"بیشترین سرعت یک دانلود: {format_size(summary['peak_speed'])}/s | تلاش دوباره: {summary['retries']}\n"
+        f"زمان مراحل (مجموع همه دانلودها): {phases}"
+    )
+
+def save_batch_report(jobs, summary, folder=None):
+    folder = folder or os.path.join(user_data_dir(), "reports")
+    os.makedirs(folder, exist_ok=True)
+    base = os.path.join(folder, f"batch-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}")
+    with open(f"{base}.json", 'w', encoding='utf-8') as f:
+        json.dump({"summary": summary, "jobs": jobs}, f, ensure_ascii=False, indent=2)
+    with open(f"{base}.csv", 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(jobs)
+    return f"{base}.json", f"{base}.csv"
+
+class DownloadScheduler:
+    REBALANCE_INTERVAL = 5
+    MAX_RETRIES = 3
+    RETRY_BASE_DELAY = 2
+    RETRY_MAX_DELAY = 120
+    RATE_LIMIT_BASE_DELAY = 30
+    RATE_LIMIT_MAX_DELAY = 600
+
+    def __init__(self, job_builder, max_workers=3, engine_name=ENGINE_INPROCESS, store=None, index=None,
+                 on_item_changed=ignore, on_message=ignore, on_progress=ignore, on_throughput=ignore,
+                 on_finished=ignore):
+        self.job_builder = job_builder
+        self.store = store
+        self.index = index
+        self.bandwidth = BandwidthManager()
+        self.engine_name = engine_name
+        self.max_workers = max(1, max_workers)
+        self.on_item_changed = on_item_changed
+        self.on_message = on_message
+        self.on_progress = on_progress
+        self.on_throughput = on_throughput
+        self.on_finished = on_finished
+        self.lock = threading.RLock()
+        self.done = threading.Event()
+        self.done.set()
+        self.items = []
+        self.options = {}
+        self.workers = {}
+        self.next_index = 0
+        self.skipped = 0
+        self.holds = 0
+        self.last_progress = None
+        self.max_retries = self.MAX_RETRIES
+        self.retry_queue = []
+        self.paused_until = 0
+        self.rate_limit_strikes = 0
+        self.wake_timer = None
+        self.wake_at = None
+        self.activated_at = None
+        self.active_seconds = 0
+        self.postprocessor = None
+        self.postprocessing = 0
+        self.running = False
+        self.active = False
+        self.stopped = False
+
+    def start(self, urls, format_specs=None, options=None):
+        format_specs = format_specs or [None] * len(urls)
+        self.start_items([BatchItem(url, format_spec) for url, format_spec in zip(urls, format_specs)], options)
+
+    def start_items(self, items, options=None):
+        with self.lock:
+            for item in items:
+                if item.status not in (ITEM_DONE, ITEM_FILTERED):
+                    item.status = ITEM_QUEUED
+                    item.progress = 0
+                    item.attempts = 0
+                else:
+                    item.progress = 100
+            self.items = items
+            self.options = options or {}
+            if self.store is not None:
+                self.store.save_batch(self.items, self.options)
+            self.workers = {}
+            self.next_index = 0
+            self.skipped = 0
+            self.last_progress = None
+            self.retry_queue = []
+            self.paused_until = 0
+            self.rate_limit_strikes = 0
+            self.active_seconds = 0
+            self._activate()
+            self._report_progress()
+            self._fill_slots()
+
+    def enqueue(self, urls, format_specs=None):
+        format_specs = format_specs or [None] * len(urls)
+        self.enqueue_items([BatchItem(url, format_spec) for url, format_spec in zip(urls, format_specs)])
+
+    def enqueue_items(self, items):
+        with self.lock:
+            start = len(self.items)
+            self.items.extend(items)
+            if self.store is not None:
+                self.store.append_items(start, items)
+            for index in range(start, len(self.items)):
+                self.on_item_changed(index)
+            if not self.active and not self.stopped:
+                self._activate()
+            self._fill_slots()
+
+    def resume(self):
+        with self.lock:
+            self.stopped = False
+
+    def hold(self):
+        with self.lock:
+            self.holds += 1
+
+    def release(self):
+        with self.lock:
+            self.holds = max(0, self.holds - 1)
+            self._check_finished()
+
+    def backlog(self):
+        with self.lock:
+            return len(self.items) - self.next_index
+
+    def stop(self):
+        with self.lock:
+            self.running = False
+            self.stopped = True
+            for task in list(self.workers.values()):
+                task.stop()
+            waiting = [(index, self.items[index]) for _, index in self.retry_queue]
+            self.retry_queue = []
+            for index, item in waiting:
+                item.status = ITEM_FAILED
+                self.on_item_changed(index)
+            if waiting and self.store is not None:
+                self.store.update_items(waiting)
+            self._schedule_wake(time.monotonic())
+            self._check_finished()
+
+    def retry_failed(self):
+        with self.lock:
+            failed = [index for index, item in enumerate(self.items) if item.status == ITEM_FAILED]
+            now = time.monotonic()
+            for index in failed:
+                item = self.items[index]
+                item.status = ITEM_WAITING
+                item.progress = 0
+                item.attempts = 0
+                item.failure = None
+                item.error = ""
+                self.retry_queue.append((now, index))
+                self._persist(index)
+                self.on_item_changed(index)
+            if failed:
+                if not self.active:
+                    self.paused_until = 0
+                    self.rate_limit_strikes = 0
+                    self._activate()
+                self._report_progress()
+                self._fill_slots()
+            return len(failed)
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def set_max_workers(self, count):
+        with self.lock:
+            self.max_workers = max(1, count)
+            if self.running:
+                self._fill_slots()
+
+    def _has_rate_budget(self):
+        global_limit = self.bandwidth.current_global_limit()
+        if not global_limit or create_engine(self.engine_name).live_rate_limit:
+            return True
+        return global_limit - self.fixed_rate_reserved() >= MIN_SHARED_RATE
+
+    def fixed_rate_reserved(self):
+        return sum(task.job.rate_limit or 0 for task in self.workers.values() if not task.live_rate_limit)
+
+    def rebalance(self):
+        with self.lock:
+            live = [task for task in self.workers.values() if task.live_rate_limit]
+            reserved = self.fixed_rate_reserved()
+            for task in live:
+                task.set_rate_limit(self.bandwidth.job_rate(len(live), task.job_cap, reserved=reserved))
+
+    def current_throughput(self):
+        with self.lock:
+            return sum(item.speed or 0 for item in self.items if item.status == ITEM_RUNNING)
+
+    def report(self):
+        with self.lock:
+            jobs = [job_report(item) for item in self.items]
+            elapsed = self.active_seconds + (time.monotonic() - self.activated_at if self.active else 0)
+        return jobs, summarize_jobs(jobs, elapsed)
+
+    def counts(self):
+        with self.lock:
+            counts = {status: 0 for status in ITEM_STATUS_LABELS}
+            for item in self.items:
+                counts[item.status] += 1
+            return counts
+
+    def aggregate_progress(self):
+        with self.lock:
+            if not self.items:
+                return 0
+            total = sum(100 if item.status in (ITEM_DONE, ITEM_FAILED, ITEM_FILTERED) else item.progress for item in self.items)
+            return total // len(self.items)
+
+    def _report_progress(self):
+        progress = self.aggregate_progress()
+        if progress != self.last_progress:
+            self.last_progress = progress
+            self.on_progress(progress)
+
+    def _activate(self):
+        if not self.active:
+            self.activated_at = time.monotonic()
+        self.running = True
+        self.active = True
+        self.stopped = False
+        self.done.clear()
+        threading.Thread(target=self._rebalance_loop, daemon=True).start()
+
+    def _rebalance_loop(self):
+        while not self.done.wait(self.REBALANCE_INTERVAL):
+            self.rebalance()
+
+    def _fill_slots(self):
+        now = time.monotonic()
+        skipped = []
+        while self.running and now >= self.paused_until and len(self.workers) < self.max_workers \
+                and self._has_rate_budget():
+            index = self._next_ready(now)
+            if index is None:
+                break
+            if self._already_downloaded(index):
+                skipped.append((index, self.items[index]))
+            else:
+                self._launch(index)
+        if skipped:
+            self.skipped += len(skipped)
+            if self.store is not None:
+                self.store.update_items(skipped)
+            self._report_progress()
+        self._schedule_wake(now)
+        self._check_finished()
+
+    def _next_ready(self, now):
+        for position, (ready_at, index) in enumerate(self.retry_queue):
+            if ready_at <= now:
+                del self.retry_queue[position]
+                return index
+        while self.next_index < len(self.items):
+            index = self.next_index
+            self.next_index += 1
+            if self.items[index].status == ITEM_QUEUED:
+                return index
+        return None
+
+    def _schedule_wake(self, now):
+        wake_at = None
+        if self.running and now < self.paused_until and (self.retry_queue or self.next_index < len(self.items)):
+            wake_at = self.paused_until
+        elif self.running and self.retry_queue:
+            wake_at = min(ready_at for ready_at, _ in self.retry_queue)
+        if wake_at == self.wake_at:
+            return
+        if self.wake_timer is not None:
+            self.wake_timer.cancel()
+            self.wake_timer = None
+        self.wake_at = wake_at
+        if wake_at is not None:
+            self.wake_timer = threading.Timer(max(wake_at - now, 0) + 0.05, self._wake)
+            self.wake_timer.daemon = True
+            self.wake_timer.start()
+
+    def _wake(self):
+        with self.lock:
+            self.wake_timer = None
+            self.wake_at = None
+            if self.running:
+                self._fill_slots()
+
+    def _already_downloaded(self, index):
+        if self.index is None:
+            return False
+        item = self.items[index]
+        entry = self.index.get(item.url)
+        if entry is None:
+            return False
+        if not self.index.is_current(entry, item.format_spec):
+            item.redownload = True
+            self.on_message(index, f"فایل دانلود قبلی پیدا نشد، تغییر کرده یا با کیفیت دیگری بوده است؛ دوباره دانلود می‌شود: {entry['path'] or item.url}")
+            return False
+        item.status = ITEM_DONE
+        item.progress = 100
+        item.output_path = entry['path']
+        item.skipped = True
+        self.on_item_changed(index)
+        self.on_message(index, f"قبلاً دانلود شده است، رد شد: {entry['path'] or item.url}")
+        return True
+
+    def _persist(self, index):
+        if self.store is not None:
+            self.store.update_item(index, self.items[index])
+
+    def _launch(self, index):
+        item = self.items[index]
+        item.status = ITEM_RUNNING
+        item.progress = 0
+        item.attempts += 1
+        job = self.job_builder(item)
+        if item.redownload:
+            job.download_archive = None
+        job.date_after = item.date_after
+        job.date_before = item.date_before
+        job_cap = job.rate_limit
+        task = DownloadTask(
+            job, self.engine_name,
+            on_progress=lambda value: self._on_task_progress(index, value),
+            on_stats=lambda stats: self._on_task_stats(index, stats),
+            on_message=lambda text: self.on_message(index, text),
+            on_output_path=lambda path: self._on_task_output_path(index, path),
+            metrics=item.metrics,
+        )
+        task.job_cap = job_cap
+        reserved = self.fixed_rate_reserved()
+        if task.live_rate_limit:
+            live = sum(1 for other in self.workers.values() if other.live_rate_limit)
+            job.rate_limit = self.bandwidth.job_rate(live + 1, job_cap, reserved=reserved)
+        else:
+            fixed = len(self.workers) - sum(1 for other in self.workers.values() if other.live_rate_limit)
+            job.rate_limit = self.bandwidth.job_rate(max(self.max_workers - fixed, 1), job_cap, reserved=reserved)
+        self.workers[index] = task
+        self._persist(index)
+        self.on_item_changed(index)
+        threading.Thread(target=self._run_task, args=(index, task), daemon=True).start()
+        self.rebalance()
+
+    def _run_task(self, index, task):
+        try:
+            success = task.run()
+        except Exception as e:
+            task.metrics.finish()
+            task.error = str(e) or type(e).__name__
+            self._on_task_finished(index, False, task)
+            return
+        if success and self.postprocessor is not None and not task.filtered:
+            self._start_postprocess(index, task)
+            return
+        if success and self.index is not None and not task.filtered:
+            self.index.record(self.items[index].url, task.job.format_spec, self.items[index].output_path)
+        self._on_task_finished(index, success, task)
+
+    def _start_postprocess(self, index, task):
+        with self.lock:
+            self.workers.pop(index, None)
+            item = self.items[index]
+            item.status = ITEM_POSTPROCESSING
+            item.speed = None
+            item.eta = None
+            self.postprocessing += 1
+            self._persist(index)
+            self.on_item_changed(index)
+            self.postprocessor.submit(
+                item.output_path, item.title, item.url, item.metrics,
+                on_message=lambda text: self.on_message(index, text),
+                on_finished=lambda success, path, error: self._on_postprocess_finished(index, task, success, path, error),
+            )
+            self.on_throughput(self.current_throughput())
+            self._fill_slots()
+            self.rebalance()
+
+    def _on_postprocess_finished(self, index, task, success, path, error):
+        if success and self.index is not None:
+            self.index.record(self.items[index].url, task.job.format_spec, path)
+        with self.lock:
+            self.postprocessing -= 1
+            item = self.items[index]
+            item.output_path = path
+            if success:
+                item.status = ITEM_DONE
+                item.failure = None
+                item.error = ""
+                self.rate_limit_strikes = 0
+            else:
+                item.status = ITEM_FAILED
+                item.failure = FAILURE_OTHER
+                item.error = error
+                self.on_message(index, error)
+            self._persist(index)
+            self.on_item_changed(index)
+            self._report_progress()
+            self._fill_slots()
+
+    def _on_task_progress(self, index, value):
+        with self.lock:
+            item = self.items[index]
+            if item.status != ITEM_RUNNING or value == item.progress:
+                return
+            item.progress = value
+            self.on_item_changed(index)
+            self._report_progress()
+
+    def _on_task_output_path(self, index, path):
+        with self.lock:
+            self.items[index].output_path = path
+            self._persist(index)
+
+    def _on_task_stats(self, index, stats):
+        with self.lock:
+            item = self.items[index]
+            if item.status != ITEM_RUNNING:
+                return
+            item.speed = stats['speed']
+            item.eta = stats['eta']
+            self.on_item_changed(index)
+            self.on_throughput(self.current_throughput())
+
+    def _on_task_finished(self, index, success, task):
+        with self.lock:
+            self.workers.pop(index, None)
+            item = self.items[index]
+            item.speed = None
+            item.eta = None
+            if success:
+                item.status = ITEM_FILTERED if task.filtered else ITEM_DONE
+                item.progress = 100
+                item.failure = None
+                item.error = ""
+                self.rate_limit_strikes = 0
+            else:
+                item.error = task.error
+                item.failure = classify_failure(task.error)
+                retryable = item.failure in RETRYABLE_FAILURES or \
+                    (item.failure == FAILURE_AUTH and task.job.refresh_cookies())
+                if self.running and not task.cancelled and retryable and item.attempts <= self.max_retries:
+                    self._schedule_retry(index)
+                else:
+                    item.status = ITEM_FAILED
+            self._persist(index)
+            self.on_item_changed(index)
+            self._report_progress()
+            self.on_throughput(self.current_throughput())
+            self._fill_slots()
+            self.rebalance()
+
+    def _schedule_retry(self, index):
+        item = self.items[index]
+        now = time.monotonic()
+        ready_at = now + retry_delay(item.attempts, self.RETRY_BASE_DELAY, self.RETRY_MAX_DELAY)
+        if item.failure == FAILURE_RATE_LIMITED:
+            self.rate_limit_strikes += 1
+            pause = retry_delay(self.rate_limit_strikes, self.RATE_LIMIT_BASE_DELAY, self.RATE_LIMIT_MAX_DELAY)
+            if now + pause > self.paused_until:
+                self.paused_until = now + pause
+                self.on_message(index, f"سرور محدودیت تعداد درخواست اعمال کرد (429)؛ شروع دانلودهای جدید {pause:.0f} ثانیه متوقف شد.")
+            ready_at = max(ready_at, self.paused_until)
+        item.status = ITEM_WAITING
+        item.progress = 0
+        self.retry_queue.append((ready_at, index))
+        self.on_message(
+            index, f"{FAILURE_LABELS[item.failure]}؛ تلاش دوباره ({item.attempts}/{self.max_retries}) "
+                   f"پس از {ready_at - now:.0f} ثانیه."
+        )
+
+    def _check_finished(self):
+        if not self.active or self.workers or self.postprocessing:
+            return
+        if self.running and (self.next_index < len(self.items) or self.holds or self.retry_queue):
+            return
+        self.active = False
+        self.running = False
+        self.active_seconds += time.monotonic() - self.activated_at
+        self.done.set()
+        self.on_finished()
+
+COLLECTION_URL_RE = re.compile(r'[?&]list=|/playlist\b|youtube\.com/(?:channel/|c/|user/|@)')
+PLAYLIST_RANGE_RE = re.compile(r'^(\d*)\s*-\s*(\d*)$')
+
+def is_collection_url(url):
+    return bool(COLLECTION_URL_RE.search(url))
+
+def parse_playlist_range(text):
+    text = text.strip()
+    if not text:
+        return None, None
+    if text.isdigit():
+        return int(text), int(text)
+    match = PLAYLIST_RANGE_RE.match(text)
+    if not match or not any(match.groups()):
+        raise ValueError(f"بازه نامعتبر است: {text} (نمونه درست: 1-50 یا 10-)")
+    start, end = (int(value) if value else None for value in match.groups())
+    if start and end and start > end:
+        raise ValueError(f"ابتدای بازه از انتهای آن بزرگ‌تر است: {text}")
+    return start, end
+
+def parse_date(text):
+    text = text.strip()
+    if not text:
+        return None
+    date = text.replace('-', '').replace('/', '')
+    try:
+        datetime.datetime.strptime(date, '%Y%m%d')
+    except ValueError:
+        raise ValueError(f"تاریخ نامعتبر است: {text} (نمونه درست: 2024-01-31)")
+    return date
+
+def entry_upload_date(entry):
+    if entry.get('upload_date'):
+        return entry['upload_date']
+    timestamp = entry.get('timestamp') or entry.get('release_timestamp')
+    if timestamp:
+        return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).strftime('%Y%m%d')
+    return None
+
+class PlaylistFilter:
+    def __init__(self, start=None, end=None, min_duration=None, max_duration=None, date_after=None, date_before=None):
+        self.start = start
+        self.end = end
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.date_after = date_after
+        self.date_before = date_before
+
+    def past_range(self, position):
+        return self.end is not None and position > self.end
+
+    def deferred_dates(self, entry):
+        if entry_upload_date(entry) is not None:
+            return None, None
+        return self.date_after, self.date_before
+
+    def matches(self, position, entry):
+        if self.start is not None and position < self.start:
+            return False
+        duration = entry.get('duration')
+        if duration is not None:
+            if self.min_duration and duration < self.min_duration:
+                return False
+            if self.max_duration and duration > self.max_duration:
+                return False
+        date = entry_upload_date(entry)
+        if date is not None:
+            if self.date_after and date < self.date_after:
+                return False
+            if self.date_before and date > self.date_before:
+                return False
+        return True
+
+def iter_collection_entries(url, browser, is_cancelled=None):
+    is_cancelled = is_cancelled or (lambda: False)
+    creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    cookies = shared_cookies(browser)
+    cookie_file = None
+    try:
+        cookie_file = cookies.acquire()[0] if cookies is not None else None
+        command = [YTDLP_BIN, *cookie_args(browser, cookie_file), "--flat-playlist", "--lazy-playlist", "-j", "--", url]
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="replace",
+            creationflags=creationflags
+        )
+    except OSError as e:
+        if cookie_file:
+            remove_file(cookie_file)
+        raise ProbeError(launch_error(e))
+    output = deque(maxlen=20)
+    try:
+        for line in process.stdout:
+            if is_cancelled():
+                return
+            line = line.strip()
+            if line.startswith('{'):
+                try:
+                    yield json.loads(line)
+                    continue
+                except json.JSONDecodeError:
+                    pass
+            if line:
+                output.append(line)
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        process.wait()
+        if cookie_file:
+            remove_file(cookie_file)
+    if process.returncode != 0:
+        raise ProbeError(describe_probe_error("\n".join(output), creationflags))
+
+class CollectionExpander:
+    MAX_DEPTH = 2
+    ENQUEUE_BATCH = 20
+
+    def __init__(self, scheduler, browser="None", playlist_filter=None, format_spec=None,
+                 on_message=ignore, on_finished=ignore):
+        self.scheduler = scheduler
+        self.browser = browser
+        self.playlist_filter = playlist_filter or PlaylistFilter()
+        self.format_spec = format_spec
+        self.on_message = on_message
+        self.on_finished = on_finished
+        self.cancelled = False
+        self.finished = False
+        self.added = 0
+        self.filtered = 0
+        self.duplicates = 0
+        self.deferred = 0
+        self.errors = 0
+
+    def start(self, urls):
+        self.scheduler.hold()
+        threading.Thread(target=self.run, args=(urls,), daemon=True).start()
+
+    def stop(self):
+        self.cancelled = True
+
+    def run(self, urls):
+        try:
+            with self.scheduler.lock:
+                seen = {canonical_video_key(item.url) for item in self.scheduler.items}
+            for url in urls:
+                if self.cancelled:
+                    break
+                self.on_message(f"در حال فهرست کردن ویدیوهای: {url}")
+                try:
+                    self.expand(url, seen)
+                except ProbeError as e:
+                    self.errors += 1
+                    self.on_message(str(e))
+            self.on_message(
+                f"فهرست کردن به پایان رسید: {self.added} ویدیو به صف اضافه شد "
+                f"({self.filtered} مورد فیلتر شد، {self.duplicates} مورد تکراری)"
+            )
+            if self.deferred:
+                self.on_message(
+                    f"تاریخ انتشار {self.deferred} ویدیو در فهرست پلی‌لیست نبود؛ فیلتر تاریخ هنگام دانلود بررسی می‌شود "
+                    "و ویدیوهای خارج از بازه دانلود نمی‌شوند."
+                )
+        finally:
+            self.finished = True
+            self.scheduler.release()
+            self.on_finished()
+
+    def expand(self, url, seen):
+        pending = []
+        position = 0
+        try:
+            for entry_url, entry in self.video_entries(url):
+                position += 1
+                if self.playlist_filter.past_range(position):
+                    break
+                if not self.playlist_filter.matches(position, entry):
+                    self.filtered += 1
+                    continue
+                key = canonical_video_key(entry_url)
+                if key in seen:
+                    self.duplicates += 1
+                    continue
+                seen.add(key)
+                item = BatchItem(entry_url, self.format_spec, entry.get('title'))
+                item.date_after, item.date_before = self.playlist_filter.deferred_dates(entry)
+                if item.date_after or item.date_before:
+                    self.deferred += 1
+                pending.append(item)
+                if len(pending) >= self.ENQUEUE_BATCH or self.scheduler.backlog() < self.scheduler.max_workers:
+                    self.flush(pending)
+        finally:
+            self.flush(pending)
+
+    def video_entries(self, url, depth=0):
+        for entry in iter_collection_entries(url, self.browser, lambda: self.cancelled):
+            entry_url = entry.get('webpage_url') or entry.get('url')
+            if not entry_url:
+                continue
+            if depth < self.MAX_DEPTH and entry.get('_type') in ('url', 'playlist') and is_collection_url(entry_url):
+                yield from self.video_entries(entry_url, depth + 1)
+            else:
+                yield entry_url, entry
+
+    def flush(self, pending):
+        if pending and not self.cancelled:
+            self.added += len(pending)
+            self.scheduler.enqueue_items(list(pending))
+        pending.clear()
@@ -0,0 +1,1161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+
+import sys
+import os
+from PyQt6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
+                             QPushButton, QTextEdit, QComboBox, QProgressBar, 
+                             QFileDialog, QMessageBox, QGroupBox, QFormLayout,
+                             QSpinBox, QTableWidget, QTableWidgetItem, QHeaderView, QCheckBox,
+                             QLineEdit, QPlainTextEdit)
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal, Qt
+from PyQt6.QtGui import QPixmap, QFont
+import requests
+import shutil
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from ud_core import (
+    YT_DLP_AVAILABLE, ENGINE_INPROCESS, ENGINE_LABELS, ITEM_QUEUED, ITEM_RUNNING, ITEM_DONE, ITEM_FAILED,
+    ITEM_WAITING, ITEM_STATUS_LABELS, FAILURE_LABELS, FAILURE_OTHER, LogBuffer, MetadataCache, QueueStore,
+    DownloadIndex, DownloadJob, DownloadTask, DownloadScheduler, ProbeError, report_summary_text, save_batch_report,
+    probe_video, probe_many, extract_audio_many, find_video_files, render_formats_table, parse_video_formats,
+    quality_choices, format_size, format_eta, parse_rate, parse_schedule, default_save_path,
+    default_archive_path, is_collection_url, parse_playlist_range, parse_date, PlaylistFilter, CollectionExpander,
+    close_shared_cookies, ITEM_POSTPROCESSING, ITEM_FILTERED, POSTPROCESS_STEPS, POSTPROCESS_LABELS, POSTPROCESS_THUMBNAIL,
+    PostProcessor, FORMAT_POLICIES, SINGLE_DEFAULT_POLICY, parse_format_policy,
+)
+
+STYLESHEET = """
+QWidget {
+    background-color: #2c3e50;
+    color: #ecf0f1;
+    font-family: Segoe UI, Arial, sans-serif;
+    font-size: 10pt;
+}
+QGroupBox {
+    border: 1px solid #34495e;
+    border-radius: 5px;
+    margin-top: 1em;
+    font-weight: bold;
+}
+QGroupBox::title {
+    subcontrol-origin: margin;
+    subcontrol-position: top center;
+    padding: 0 10px;
+}
+QLabel {
+    color: #ecf0f1;
+}
+QTextEdit, QPlainTextEdit, QComboBox, QSpinBox, QTableWidget, QLineEdit {
+    background-color: #34495e;
+    border: 1px solid #7f8c8d;
+    border-radius: 4px;
+    padding: 5px;
+}
+QComboBox::drop-down {
+    border: none;
+}
+QComboBox::down-arrow {
+    image: url(down_arrow.png); /* Fallback, not essential */
+}
+QPushButton {
+    background-color: #3498db;
+    color: white;
+    border: none;
+    padding: 8px 16px;
+    border-radius: 4px;
+    font-weight: bold;
+}
+QPushButton:hover {
+    background-color: #2980b9;
+}
+QPushButton:disabled {
+    background-color: #566573;
+    color: #95a5a6;
+}
+QProgressBar {
+    border: 1px solid #34495e;
+    border-radius: 5px;
+    text-align: center;
+    color: #ecf0f1;
+}
+QProgressBar::chunk {
+    background-color: #27ae60;
+    border-radius: 4px;
+}
+QMessageBox {
+    background-color: #34495e;
+}
+"""
+
+class GetFormatsThread(QThread):
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str)
+    thumbnail = pyqtSignal(str, str)
+
+    def __init__(self, url, browser):
+        super().__init__()
+        self.url = url
+        self.browser = browser
+
+    def run(self):
+        try:
+            info = probe_video(self.url, self.browser)
+        except ProbeError as e:
+            self.thumbnail.emit("خطا در گرفتن اطلاعات ویدیو", None)
+            self.error.emit(str(e))
+            return
+
+        self.thumbnail.emit(info.get('title') or "عنوان نامشخص", info.get('thumbnail'))
+        self.finished.emit(info)
+
+class ThumbnailLoader(QObject):
+    loaded = pyqtSignal(str, QPixmap)
+    failed = pyqtSignal(str, str)
+    fetched = pyqtSignal(str, bytes)
+    fetch_failed = pyqtSignal(str, str)
+
+    def __init__(self, size, max_entries=64, max_workers=4, parent=None):
+        super().__init__(parent)
+        self.size = size
+        self.max_entries = max_entries
+        self.session = requests.Session()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.pixmaps = OrderedDict()
+        self.pending = set()
+        self.fetched.connect(self.on_fetched)
+        self.fetch_failed.connect(self.on_fetch_failed)
+
+    def request(self, url):
+        pixmap = self.pixmaps.get(url)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(url)
+            self.loaded.emit(url, pixmap)
+            return
+        if url in self.pending:
+            return
+        self.pending.add(url)
+        self.executor.submit(self.fetch, url)
+
+    def fetch(self, url):
+        try:
+            response = self.session.get(url, timeout=10)
+            response.raise_for_status()
+            self.fetched.emit(url, response.content)
+        except requests.exceptions.RequestException as e:
+            self.fetch_failed.emit(url, str(e))
+
+    def on_fetched(self, url, data):
+        self.pending.discard(url)
+        pixmap = QPixmap()
+        if not pixmap.loadFromData(data):
+            self.failed.emit(url, "فرمت تصویر پشتیبانی نمی‌شود")
+            return
+        pixmap = pixmap.scaled(self.size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+        self.pixmaps[url] = pixmap
+        while len(self.pixmaps) > self.max_entries:
+            self.pixmaps.popitem(last=False)
+        self.loaded.emit(url, pixmap)
+
+    def on_fetch_failed(self, url, message):
+        self.pending.discard(url)
+        self.failed.emit(url, message)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+class BulkProbeThread(QThread):
+    result = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, urls, browser, cache, max_workers=4):
+        super().__init__()
+        self.urls = urls
+        self.browser = browser
+        self.cache = cache
+        self.max_workers = max_workers
+        self.cancelled = False
+
+    def run(self):
+        probe_many(
+            self.urls, self.browser, self.cache, self.max_workers,
+            on_result=self.result.emit, on_failed=self.failed.emit, is_cancelled=lambda: self.cancelled,
+        )
+
+    def stop(self):
+        self.cancelled = True
+
+class DownloadThread(QThread):
+    progress = pyqtSignal(int)
+    stats = pyqtSignal(object)
+    output_path = pyqtSignal(str)
+    finished_signal = pyqtSignal(bool)
+
+    def __init__(self, job, engine_name=ENGINE_INPROCESS, on_message=None):
+        super().__init__()
+        self.task = DownloadTask(
+            job, engine_name, on_progress=self.progress.emit, on_stats=self.stats.emit,
+            on_message=on_message, on_output_path=self.output_path.emit,
+        )
+
+    def run(self):
+        self.finished_signal.emit(self.task.run())
+
+    def stop(self):
+        self.task.stop()
+
+LOG_MAX_LINES = 5000
+LOG_REFRESH_INTERVAL = 100
+
+BATCH_COLUMNS = ["عنوان / لینک", "مدت", "کیفیت", "حجم تخمینی", "وضعیت", "پیشرفت", "سرعت / زمان باقی‌مانده"]
+COL_TITLE, COL_DURATION, COL_QUALITY, COL_SIZE, COL_STATUS, COL_PROGRESS, COL_SPEED = range(len(BATCH_COLUMNS))
+
+class SchedulerSignals(QObject):
+    item_changed = pyqtSignal(int)
+    progress = pyqtSignal(int)
+    throughput = pyqtSignal(float)
+    finished = pyqtSignal()
+
+class RebuildIndexThread(QThread):
+    rebuilt = pyqtSignal(int, int, int)
+
+    def __init__(self, download_index, folder):
+        super().__init__()
+        self.download_index = download_index
+        self.folder = folder
+
+    def run(self):
+        self.rebuilt.emit(*self.download_index.rebuild(self.folder))
+
+class ExtractAudioThread(QThread):
+    planned = pyqtSignal(int, str)
+    progress = pyqtSignal(int, int)
+    file_finished = pyqtSignal(int, str)
+    error = pyqtSignal(int, str)
+
+    def __init__(self, video_files, force_mp3=False, max_workers=None):
+        super().__init__()
+        self.video_files = video_files
+        self.force_mp3 = force_mp3
+        self.max_workers = max_workers
+
+    def run(self):
+        extract_audio_many(
+            self.video_files, self.force_mp3, self.max_workers,
+            on_planned=self.planned.emit, on_progress=self.progress.emit,
+            on_finished=self.file_finished.emit, on_error=self.error.emit,
+        )
+
+class YouTubeDownloader(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.downloaded_file = None
+        self.format_sizes = {}
+        self.custom_path = None
+        self.metadata_cache = MetadataCache()
+        self.queue_store = QueueStore()
+        self.download_index = DownloadIndex()
+        self.download_archive_path = default_archive_path()
+        self.log_buffer = LogBuffer(max_lines=LOG_MAX_LINES)
+        self.batch_signals = SchedulerSignals(self)
+        self.batch_scheduler = DownloadScheduler(
+            self.build_batch_job, store=self.queue_store, index=self.download_index,
+            on_item_changed=self.batch_signals.item_changed.emit,
+            on_message=self.log_batch_message,
+            on_progress=self.batch_signals.progress.emit,
+            on_throughput=self.batch_signals.throughput.emit,
+            on_finished=self.batch_signals.finished.emit,
+        )
+        self.batch_signals.item_changed.connect(self.on_batch_item_changed)
+        self.batch_signals.progress.connect(self.on_batch_progress)
+        self.batch_signals.finished.connect(self.on_batch_finished)
+        self.collection_expander = None
+        self.batch_command_options = {}
+        self.probed_urls = []
+        self.probe_rows = []
+        self.probe_policy = None
+        self.batch_choices = {}
+        self.batch_infos = {}
+        self.current_thumbnail_url = None
+        self.initUI()
+        self.thumbnail_loader = ThumbnailLoader(self.thumbnail_label.size(), parent=self)
+        self.thumbnail_loader.loaded.connect(self.on_thumbnail_loaded)
+        self.thumbnail_loader.failed.connect(self.on_thumbnail_failed)
+        self.check_dependencies()
+        QTimer.singleShot(0, self.offer_resume)
+
+    def initUI(self):
+        self.setWindowTitle('YouTube Downloader')
+        self.setGeometry(100, 100, 950, 850) 
+
+        main_layout = QVBoxLayout(self)
+
+        input_group = QGroupBox("مرحله ۱: لینک‌ها و تنظیمات")
+        form_layout = QFormLayout()
+
+        self.url_input = QTextEdit()
+        self.url_input.setPlaceholderText("هر لینک ویدیو، پلی‌لیست یا کانال را در یک خط جدید وارد کنید...")
+        self.url_input.setFixedHeight(100)
+        form_layout.addRow(QLabel("لینک‌های ویدیو:"), self.url_input)
+
+        self.browser_select = QComboBox()
+        self.browser_select.addItems(["Firefox", "Chrome", "Edge", "Brave", "None"])
+        form_layout.addRow(QLabel("استفاده از کوکی مرورگر:"), self.browser_select)
+
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, 16)
+        self.workers_spin.setValue(3)
+        form_layout.addRow(QLabel("تعداد دانلود/بررسی همزمان:"), self.workers_spin)
+
+        self.engine_select = QComboBox()
+        for engine_name, label in ENGINE_LABELS.items():
+            if engine_name == ENGINE_INPROCESS and not YT_DLP_AVAILABLE:
+                continue
+            self.engine_select.addItem(label, engine_name)
+        form_layout.addRow(QLabel("موتور دانلود:"), self.engine_select)
+
+        self.fragments_spin = QSpinBox()
+        self.fragments_spin.setRange(1, 16)
+        self.fragments_spin.setValue(4)
+        self.aria2c_check = QCheckBox("استفاده از aria2c (دانلود چند اتصالی)")
+        fragments_layout = QHBoxLayout()
+        fragments_layout.addWidget(self.fragments_spin)
+        fragments_layout.addWidget(self.aria2c_check)
+        form_layout.addRow(QLabel("اتصال همزمان برای هر دانلود:"), fragments_layout)
+
+        self.global_rate_input = QLineEdit()
+        self.global_rate_input.setPlaceholderText("مثلاً 5M (خالی = نامحدود)، بین دانلودهای فعال تقسیم می‌شود")
+        self.job_rate_input = QLineEdit()
+        self.job_rate_input.setPlaceholderText("مثلاً 800K (خالی = نامحدود)")
+        rate_layout = QHBoxLayout()
+        rate_layout.addWidget(QLabel("کل:"))
+        rate_layout.addWidget(self.global_rate_input)
+        rate_layout.addWidget(QLabel("هر دانلود:"))
+        rate_layout.addWidget(self.job_rate_input)
+        form_layout.addRow(QLabel("محدودیت سرعت:"), rate_layout)
+
+        self.rate_schedule_input = QLineEdit()
+        self.rate_schedule_input.setPlaceholderText("مثلاً 08:00-17:00=2M; 00:00-07:00=0 (۰ = بدون محدودیت)")
+        form_layout.addRow(QLabel("برنامه زمانی سرعت کل:"), self.rate_schedule_input)
+
+        self.postprocess_checks = {}
+        postprocess_layout = QHBoxLayout()
+        for step in POSTPROCESS_STEPS:
+            self.postprocess_checks[step] = QCheckBox(POSTPROCESS_LABELS[step])
+            postprocess_layout.addWidget(self.postprocess_checks[step])
+        postprocess_label = QLabel("پردازش پس از دانلود دسته‌ای:")
+        postprocess_label.setToolTip("این مراحل همزمان با دانلود موارد بعدی روی فایل‌های دانلودشده اجرا می‌شوند.")
+        form_layout.addRow(postprocess_label, postprocess_layout)
+
+        self.playlist_range_input = QLineEdit()
+        self.playlist_range_input.setPlaceholderText("مثلاً 1-50 یا 10- (خالی = همه)")
+        self.min_duration_spin = QSpinBox()
+        self.max_duration_spin = QSpinBox()
+        for spin in (self.min_duration_spin, self.max_duration_spin):
+            spin.setRange(0, 1440)
+            spin.setSuffix(" دقیقه")
+            spin.setSpecialValueText("بدون محدودیت")
+        playlist_layout = QHBoxLayout()
+        playlist_layout.addWidget(QLabel("بازه:"))
+        playlist_layout.addWidget(self.playlist_range_input)
+        playlist_layout.addWidget(QLabel("حداقل مدت:"))
+        playlist_layout.addWidget(self.min_duration_spin)
+        playlist_layout.addWidget(QLabel("حداکثر مدت:"))
+        playlist_layout.addWidget(self.max_duration_spin)
+        form_layout.addRow(QLabel("فیلتر پلی‌لیست/کانال:"), playlist_layout)
+
+        self.date_after_input = QLineEdit()
+        self.date_after_input.setPlaceholderText("مثلاً 2024-01-31")
+        self.date_before_input = QLineEdit()
+        self.date_before_input.setPlaceholderText("مثلاً 2024-12-31")
+        date_layout = QHBoxLayout()
+        date_layout.addWidget(QLabel("از:"))
+        date_layout.addWidget(self.date_after_input)
+        date_layout.addWidget(QLabel("تا:"))
+        date_layout.addWidget(self.date_before_input)
+        date_label = QLabel("فیلتر تاریخ انتشار:")
+        date_label.setToolTip(
+            "اگر تاریخ انتشار ویدیو در فهرست پلی‌لیست نباشد، yt-dlp هنگام دانلود آن را بررسی می‌کند و ویدیوهای خارج از بازه را رد می‌کند."
+        )
+        form_layout.addRow(date_label, date_layout)
+
+        self.cache_ttl_spin = QSpinBox()
+        self.cache_ttl_spin.setRange(0, 168)
+        self.cache_ttl_spin.setValue(self.metadata_cache.ttl // 3600)
+        self.cache_ttl_spin.setSuffix(" ساعت")
+        form_layout.addRow(QLabel("اعتبار کش اطلاعات (۰ = غیرفعال):"), self.cache_ttl_spin)
+        
+        input_group.setLayout(form_layout)
+        main_layout.addWidget(input_group)
+
+        details_group = QGroupBox("مرحله ۲: اطلاعات ویدیو و عملیات دانلود")
+        details_layout = QHBoxLayout()
+
+        info_layout = QVBoxLayout()
+        self.thumbnail_label = QLabel('پیش‌نمایش ویدیو در اینجا نمایش داده می‌شود')
+        self.thumbnail_label.setStyleSheet("border: 1px dashed #7f8c8d; background-color: #34495e; border-radius: 5px;")
+        self.thumbnail_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.thumbnail_label.setFixedSize(320, 180)
+        self.title_label = QLabel('عنوان ویدیو: -')
+        self.title_label.setAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop)
+        self.title_label.setWordWrap(True)
+        self.title_label.setMinimumHeight(40)
+        info_layout.addWidget(self.thumbnail_label)
+        info_layout.addWidget(self.title_label)
+        info_layout.addStretch()
+        
+        actions_layout = QVBoxLayout()
+        self.get_formats_btn = QPushButton('بارگیری اطلاعات اولین لینک')
+        self.probe_all_btn = QPushButton('بررسی همه لینک‌ها (موازی)')
+        self.quality_select = QComboBox()
+        quality_layout = QHBoxLayout()
+        quality_layout.addWidget(QLabel("انتخاب کیفیت (برای دانلود تکی):"))
+        quality_layout.addWidget(self.quality_select)
+        self.format_policy_select = QComboBox()
+        self.format_policy_select.setEditable(True)
+        self.format_policy_select.addItems(list(FORMAT_POLICIES))
+        self.format_policy_select.setToolTip(
+            "یکی از پیش‌تنظیم‌ها یا قانون دلخواه، مثلاً height=1080,codec=avc1,size=500M,fallback=audio"
+        )
+        policy_layout = QHBoxLayout()
+        policy_layout.addWidget(QLabel("قانون انتخاب کیفیت:"))
+        policy_layout.addWidget(self.format_policy_select)
+        
+        self.download_btn = QPushButton('دانلود ویدیو تکی')
+        self.download_batch_btn = QPushButton('دانلود همه لینک‌ها (همزمان)')
+        self.stop_batch_btn = QPushButton('توقف دانلود دسته‌ای')
+        self.stop_batch_btn.setEnabled(False)
+        self.retry_failed_btn = QPushButton('تلاش دوباره برای موارد ناموفق')
+        self.retry_failed_btn.setEnabled(False)
+        self.save_custom_btn = QPushButton('انتخاب مسیر ذخیره')
+        self.download_audio_btn = QPushButton('استخراج صدا از فایل‌ها')
+        self.extract_folder_btn = QPushButton('استخراج صدا از همه ویدیوهای یک پوشه')
+        self.force_mp3_check = QCheckBox("همیشه تبدیل به MP3 (بدون کپی مستقیم صدا)")
+        self.clear_cache_btn = QPushButton('پاک کردن کش اطلاعات')
+        self.rebuild_index_btn = QPushButton('بازسازی فهرست دانلودها از پوشه')
+
+        actions_layout.addWidget(self.get_formats_btn)
+        actions_layout.addWidget(self.probe_all_btn)
+        actions_layout.addLayout(quality_layout)
+        actions_layout.addLayout(policy_layout)
+        actions_layout.addWidget(self.download_btn)
+        actions_layout.addWidget(self.download_batch_btn)
+        actions_layout.addWidget(self.stop_batch_btn)
+        actions_layout.addWidget(self.retry_failed_btn)
+        actions_layout.addSpacing(20)
+        actions_layout.addWidget(self.save_custom_btn)
+        actions_layout.addWidget(self.download_audio_btn)
+        actions_layout.addWidget(self.extract_folder_btn)
+        actions_layout.addWidget(self.force_mp3_check)
+        actions_layout.addWidget(self.clear_cache_btn)
+        actions_layout.addWidget(self.rebuild_index_btn)
+        actions_layout.addStretch()
+
+        details_layout.addLayout(info_layout, 2) 
+        details_layout.addLayout(actions_layout, 1) 
+        details_group.setLayout(details_layout)
+        main_layout.addWidget(details_group)
+
+        log_group = QGroupBox("مرحله ۳: خروجی و لاگ")
+        log_layout = QVBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setValue(0)
+        self.batch_status_label = QLabel('')
+        self.batch_size_label = QLabel('')
+        self.throughput_label = QLabel('')
+        self.batch_table = QTableWidget(0, len(BATCH_COLUMNS))
+        self.batch_table.setHorizontalHeaderLabels(BATCH_COLUMNS)
+        self.batch_table.horizontalHeader().setSectionResizeMode(COL_TITLE, QHeaderView.ResizeMode.Stretch)
+        self.batch_table.verticalHeader().setVisible(False)
+        self.batch_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.batch_table.setFixedHeight(150)
+        self.formats_list = QPlainTextEdit()
+        self.formats_list.setReadOnly(True)
+        self.formats_list.setMaximumBlockCount(LOG_MAX_LINES)
+        self.formats_list.setFont(QFont("Courier New", 9))
+        
+        log_layout.addWidget(self.progress_bar)
+        log_layout.addWidget(self.batch_status_label)
+        log_layout.addWidget(self.batch_size_label)
+        log_layout.addWidget(self.throughput_label)
+        log_layout.addWidget(self.batch_table)
+        log_layout.addWidget(self.formats_list)
+        log_group.setLayout(log_layout)
+        main_layout.addWidget(log_group)
+
+        self.get_formats_btn.clicked.connect(self.start_get_formats)
+        self.probe_all_btn.clicked.connect(self.start_bulk_probe)
+        self.download_btn.clicked.connect(self.download_video)
+        self.download_batch_btn.clicked.connect(self.start_batch_download)
+        self.stop_batch_btn.clicked.connect(self.stop_batch_download)
+        self.retry_failed_btn.clicked.connect(self.retry_failed_downloads)
+        self.workers_spin.valueChanged.connect(self.batch_scheduler.set_max_workers)
+        self.global_rate_input.editingFinished.connect(self.apply_bandwidth_settings)
+        self.job_rate_input.editingFinished.connect(self.apply_bandwidth_settings)
+        self.rate_schedule_input.editingFinished.connect(self.apply_bandwidth_settings)
+        self.batch_signals.throughput.connect(self.on_throughput_changed)
+        self.batch_table.currentCellChanged.connect(self.on_batch_row_selected)
+        self.cache_ttl_spin.valueChanged.connect(self.set_cache_ttl)
+        self.clear_cache_btn.clicked.connect(self.clear_metadata_cache)
+        self.rebuild_index_btn.clicked.connect(self.rebuild_download_index)
+        self.save_custom_btn.clicked.connect(self.set_custom_path)
+        self.download_audio_btn.clicked.connect(self.select_file_for_audio_extraction)
+        self.extract_folder_btn.clicked.connect(self.select_folder_for_audio_extraction)
+
+        self.log_timer = QTimer(self)
+        self.log_timer.timeout.connect(self.flush_log)
+        self.log_timer.start(LOG_REFRESH_INTERVAL)
+
+    def log(self, text):
+        self.log_buffer.append(text)
+
+    def set_log_text(self, text):
+        self.log_buffer.append(text)
+        self.log_buffer.drain()
+        self.formats_list.setPlainText(text)
+
+    def flush_log(self):
+        lines, dropped = self.log_buffer.drain()
+        if dropped:
+            self.formats_list.appendPlainText(f"... {dropped} خط لاگ از نمایش حذف شد (متن کامل در {self.log_buffer.path})")
+        if lines:
+            self.formats_list.appendPlainText("\n".join(lines))
+
+    def check_dependencies(self):
+        self.set_log_text("در حال بررسی پیش‌نیازها...")
+        if not shutil.which("yt-dlp"):
+            QMessageBox.critical(self, "خطا", "yt-dlp یافت نشد! لطفاً آن را نصب کرده و در PATH سیستم قرار دهید.")
+            self.set_log_text("خطا: yt-dlp نصب نیست.")
+            return
+        
+        if not shutil.which("ffmpeg"):
+            QMessageBox.warning(self, "هشدار", "ffmpeg یافت نشد! برای ترکیب ویدیو و صدا و استخراج صدا، نصب آن ضروری است.")
+            self.set_log_text("هشدار: ffmpeg نصب نیست. عملکرد برنامه محدود خواهد بود.")
+            for check in self.postprocess_checks.values():
+                check.setChecked(False)
+                check.setEnabled(False)
+                check.setToolTip("ffmpeg در PATH سیستم یافت نشد.")
+
+        if shutil.which("aria2c"):
+            self.log("aria2c یافت شد: دانلود چند اتصالی در دسترس است.")
+        else:
+            self.aria2c_check.setChecked(False)
+            self.aria2c_check.setEnabled(False)
+            self.aria2c_check.setToolTip("aria2c در PATH سیستم یافت نشد.")
+            self.log("aria2c یافت نشد: فقط دانلود قطعه‌ای همزمان (concurrent fragments) فعال است.")
+        
+        self.log("\nتمام پیش‌نیازهای اصلی یافت شدند. برنامه آماده استفاده است.")
+        
+    def start_get_formats(self):
+        full_text = self.url_input.toPlainText().strip()
+        if not full_text:
+            QMessageBox.warning(self, "هشدار", "لطفاً ابتدا لینک ویدیو را وارد کنید.")
+            return
+        
+        url = full_text.split('\n')[0].strip()
+        if not url:
+            QMessageBox.warning(self, "هشدار", "هیچ لینکی در خط اول یافت نشد.")
+            return
+
+        cached_info = self.metadata_cache.get(url)
+        if cached_info is not None:
+            self.on_thumbnail_received(cached_info.get('title') or "عنوان نامشخص", cached_info.get('thumbnail'))
+            self.on_get_formats_finished(cached_info)
+            self.log(f"\n(از کش محلی خوانده شد)\n{self.metadata_cache.stats_text()}")
+            return
+
+        self.set_log_text('در حال بارگیری اطلاعات ویدیو...')
+        self.set_buttons_enabled(False)
+        self.progress_bar.setRange(0, 0) 
+        
+        browser = self.browser_select.currentText().lower()
+        self.get_formats_thread = GetFormatsThread(url, browser)
+        self.get_formats_thread.finished.connect(self.on_probe_finished)
+        self.get_formats_thread.error.connect(self.on_get_formats_error)
+        self.get_formats_thread.thumbnail.connect(self.on_thumbnail_received)
+        self.get_formats_thread.start()
+
+    def on_thumbnail_received(self, title, thumbnail_url):
+        self.title_label.setText(f'عنوان ویدیو: {title}')
+        self.current_thumbnail_url = thumbnail_url
+        if thumbnail_url:
+            self.thumbnail_label.setText('در حال بارگیری تصویر...')
+            self.thumbnail_loader.request(thumbnail_url)
+        else:
+            self.thumbnail_label.setText('تصویر پیش‌نمایش در دسترس نیست')
+
+    def on_thumbnail_loaded(self, url, pixmap):
+        if url == self.current_thumbnail_url:
+            self.thumbnail_label.setPixmap(pixmap)
+
+    def on_thumbnail_failed(self, url, message):
+        if url == self.current_thumbnail_url:
+            self.thumbnail_label.setText(f'خطا در بارگیری تصویر:\n{message}')
+
+    def on_probe_finished(self, info):
+        self.metadata_cache.put(self.get_formats_thread.url, info)
+        self.on_get_formats_finished(info)
+        self.log(f"\n{self.metadata_cache.stats_text()}")
+
+    def set_cache_ttl(self, hours):
+        self.metadata_cache.ttl = hours * 3600
+
+    def clear_metadata_cache(self):
+        self.metadata_cache.clear()
+        self.log("\nکش اطلاعات ویدیوها پاک شد.")
+
+    def on_get_formats_finished(self, info):
+        self.set_log_text(render_formats_table(info))
+        self.quality_select.clear()
+        self.format_sizes.clear()
+
+        for fmt in parse_video_formats(info):
+            self.format_sizes[fmt['format_id']] = fmt['size']
+            display_text = f"{fmt['resolution']} ({fmt['format_id']}) - {fmt['size']}"
+            self.quality_select.addItem(display_text, fmt['format_id'])
+
+        try:
+            policy = parse_format_policy(self.format_policy_select.currentText())
+        except ValueError as e:
+            self.log(str(e))
+            policy = parse_format_policy(SINGLE_DEFAULT_POLICY)
+        if policy.is_default() or policy.audio_only:
+            policy = parse_format_policy(SINGLE_DEFAULT_POLICY)
+        picked = policy.pick(info)
+        if picked is not None and picked[0] is not None:
+            self.quality_select.setCurrentIndex(self.quality_select.findData(picked[0]['format_id']))
+        elif self.quality_select.count() == 0:
+            QMessageBox.warning(self, "خطا", "هیچ فرمت ویدیویی معتبری یافت نشد. ممکن است لینک مشکل داشته باشد یا ویدیو خصوصی باشد.")
+
+        self.finish_get_formats()
+
+    def on_get_formats_error(self, message):
+        self.set_log_text(message)
+        self.quality_select.clear()
+        self.format_sizes.clear()
+        QMessageBox.warning(self, "خطا", f"خطایی در دریافت اطلاعات رخ داد:\n{message}")
+        self.finish_get_formats()
+
+    def finish_get_formats(self):
+        self.set_buttons_enabled(True)
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
+
+    def rebuild_download_index(self):
+        folder = QFileDialog.getExistingDirectory(self, 'پوشه دانلودها را برای بازسازی فهرست انتخاب کنید', self.custom_path or '')
+        if not folder:
+            return
+        self.rebuild_index_btn.setEnabled(False)
+        self.log(f"\nدر حال بررسی فایل‌های پوشه {folder} برای بازسازی فهرست دانلودها...")
+        self.rebuild_index_thread = RebuildIndexThread(self.download_index, folder)
+        self.rebuild_index_thread.rebuilt.connect(self.on_download_index_rebuilt)
+        self.rebuild_index_thread.start()
+
+    def on_download_index_rebuilt(self, added, moved, removed):
+        self.rebuild_index_btn.setEnabled(True)
+        self.log(
+            f"بازسازی فهرست انجام شد: {added} فایل جدید، {moved} فایل جابه‌جا شده، {removed} فایل حذف شده.\n"
+            f"{self.download_index.stats_text()}"
+        )
+
+    def set_custom_path(self):
+        path = QFileDialog.getExistingDirectory(self, 'پوشه ذخیره را انتخاب کنید')
+        if path:
+            self.custom_path = path
+            QMessageBox.information(self, "مسیر ذخیره", f'مسیر دلخواه انتخاب شد: {self.custom_path}')
+
+    def download_video(self):
+        full_text = self.url_input.toPlainText().strip()
+        if not full_text:
+            QMessageBox.warning(self, "خطا", "لطفاً لینک را وارد کنید!")
+            return
+        url = full_text.split('\n')[0].strip()
+
+        format_id = self.quality_select.currentData()
+        if not url or not format_id:
+            QMessageBox.warning(self, "خطا", "لطفاً لینک و کیفیت را انتخاب کنید!")
+            return
+        
+        save_path = self.get_save_path()
+        self.set_log_text(f'در حال آماده‌سازی برای دانلود در: {os.path.dirname(save_path)}')
+        
+        browser = self.browser_select.currentText().lower()
+        job = DownloadJob(url, f"{format_id}+bestaudio", save_path, browser, **self.transfer_options())
+        job.rate_limit = self.batch_scheduler.bandwidth.job_rate(len(self.batch_scheduler.workers) + 1)
+        
+        self.start_download(job)
+
+    def apply_bandwidth_settings(self):
+        try:
+            global_limit = parse_rate(self.global_rate_input.text())
+            job_limit = parse_rate(self.job_rate_input.text())
+            schedule = parse_schedule(self.rate_schedule_input.text())
+        except ValueError as e:
+            QMessageBox.warning(self, "خطا", str(e))
+            return False
+        bandwidth = self.batch_scheduler.bandwidth
+        bandwidth.global_limit = global_limit
+        bandwidth.job_limit = job_limit
+        bandwidth.schedule = schedule
+        self.batch_scheduler.rebalance()
+        return True
+
+    def on_throughput_changed(self, speed):
+        limit = self.batch_scheduler.bandwidth.current_global_limit()
+        text = f"سرعت کل دانلودها: {format_size(speed)}/s"
+        if limit:
+            text += f" (سقف فعلی: {format_size(limit)}/s)"
+        self.throughput_label.setText(text)
+
+    def transfer_options(self):
+        return {
+            "concurrent_fragments": self.fragments_spin.value(),
+            "external_downloader": "aria2c" if self.aria2c_check.isChecked() else None,
+        }
+
+    def postprocess_steps(self):
+        return [step for step, check in self.postprocess_checks.items() if check.isChecked()]
+
+    def playlist_filter(self):
+        start, end = parse_playlist_range(self.playlist_range_input.text())
+        return PlaylistFilter(
+            start, end,
+            min_duration=self.min_duration_spin.value() * 60 or None,
+            max_duration=self.max_duration_spin.value() * 60 or None,
+            date_after=parse_date(self.date_after_input.text()),
+            date_before=parse_date(self.date_before_input.text()),
+        )
+
+    def get_input_urls(self):
+        return [url.strip() for url in self.url_input.toPlainText().strip().split('\n') if url.strip()]
+
+    def reset_batch_table(self, urls, use_cache=True):
+        self.probed_urls = []
+        self.probe_rows = []
+        self.batch_choices = {}
+        self.batch_infos = {}
+        self.batch_size_label.setText('')
+        self.batch_table.setRowCount(0)
+        self.batch_table.setRowCount(len(urls))
+        for row, url in enumerate(urls):
+            cached_info = self.metadata_cache.get(url) if use_cache else None
+            self.fill_batch_row(row, url, cached_info.get('title') if cached_info else None)
+
+    def fill_batch_row(self, row, url, title=None):
+        title_item = QTableWidgetItem(title or url)
+        title_item.setToolTip(url)
+        self.batch_table.setItem(row, COL_TITLE, title_item)
+        for column in range(COL_DURATION, len(BATCH_COLUMNS)):
+            self.batch_table.setItem(row, column, QTableWidgetItem(""))
+
+    def start_bulk_probe(self):
+        urls = self.get_input_urls()
+        if not urls:
+            QMessageBox.warning(self, "هشدار", "لطفاً ابتدا لینک ویدیو را وارد کنید.")
+            return
+        try:
+            self.probe_policy = parse_format_policy(self.format_policy_select.currentText())
+        except ValueError as e:
+            QMessageBox.warning(self, "خطا", str(e))
+            return
+
+        self.reset_batch_table(urls, use_cache=False)
+        self.probed_urls = urls
+        self.probe_rows = [row for row, url in enumerate(urls) if not is_collection_url(url)]
+        for row in range(len(urls)):
+            self.batch_table.item(row, COL_STATUS).setText("در حال بررسی" if row in self.probe_rows else "پلی‌لیست/کانال")
+
+        self.log(f"\nبررسی موازی {len(self.probe_rows)} لینک...")
+        self.set_buttons_enabled(False)
+        self.progress_bar.setRange(0, len(self.probe_rows))
+        self.progress_bar.setValue(0)
+
+        browser = self.browser_select.currentText().lower()
+        probe_urls = [urls[row] for row in self.probe_rows]
+        self.bulk_probe_thread = BulkProbeThread(probe_urls, browser, self.metadata_cache, self.workers_spin.value())
+        self.bulk_probe_thread.result.connect(self.on_bulk_probe_result)
+        self.bulk_probe_thread.failed.connect(self.on_bulk_probe_failed)
+        self.bulk_probe_thread.finished.connect(self.on_bulk_probe_finished)
+        self.bulk_probe_thread.start()
+
+    def on_bulk_probe_result(self, index, info):
+        row = self.probe_rows[index]
+        self.batch_table.item(row, COL_TITLE).setText(info.get('title') or self.probed_urls[row])
+        self.batch_table.item(row, COL_DURATION).setText(format_eta(info.get('duration')))
+        self.batch_table.item(row, COL_STATUS).setText("آماده")
+
+        choices = quality_choices(info, self.probe_policy)
+        self.batch_choices[row] = choices
+        self.batch_infos[row] = info
+        quality_combo = QComboBox()
+        for label, format_spec, _ in choices:
+            quality_combo.addItem(label, format_spec)
+        quality_combo.currentIndexChanged.connect(lambda _, r=row: self.update_row_size(r))
+        self.batch_table.setCellWidget(row, COL_QUALITY, quality_combo)
+        self.update_row_size(row)
+        self.progress_bar.setValue(self.progress_bar.value() + 1)
+
+    def on_bulk_probe_failed(self, index, message):
+        row = self.probe_rows[index]
+        status_item = self.batch_table.item(row, COL_STATUS)
+        status_item.setText("خطا در بررسی")
+        status_item.setToolTip(message)
+        self.log(f"[{row + 1}] {message}")
+        self.progress_bar.setValue(self.progress_bar.value() + 1)
+
+    def on_bulk_probe_finished(self):
+        self.set_buttons_enabled(True)
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
+        self.log(f"بررسی لینک‌ها به پایان رسید: {len(self.batch_choices)} از {len(self.probe_rows)} موفق.")
+        self.log(self.metadata_cache.stats_text())
+
+    def on_batch_row_selected(self, row, *_):
+        info = self.batch_infos.get(row)
+        if info is not None:
+            self.on_thumbnail_received(info.get('title') or "عنوان نامشخص", info.get('thumbnail'))
+
+    def selected_choice(self, row):
+        combo = self.batch_table.cellWidget(row, COL_QUALITY)
+        if combo is None or row not in self.batch_choices:
+            return None
+        return self.batch_choices[row][combo.currentIndex()]
+
+    def update_row_size(self, row):
+        choice = self.selected_choice(row)
+        self.batch_table.item(row, COL_SIZE).setText(format_size(choice[2]) if choice else "")
+        self.update_batch_size()
+
+    def update_batch_size(self):
+        total = 0
+        unknown = len(self.probe_rows) - len(self.batch_choices)
+        for row in self.batch_choices:
+            size = self.selected_choice(row)[2]
+            if size:
+                total += size
+            else:
+                unknown += 1
+        text = f"حجم کل تخمینی دسته: {format_size(total)}"
+        if unknown:
+            text += f" (بدون اطلاعات حجم: {unknown} مورد)"
+        self.batch_size_label.setText(text)
+
+    def start_batch_download(self):
+        urls = self.get_input_urls()
+        if not urls:
+            QMessageBox.warning(self, "خطا", "هیچ لینکی برای دانلود وارد نشده است!")
+            return
+        try:
+            playlist_filter = self.playlist_filter()
+            format_policy = self.format_policy_select.currentText().strip()
+            parse_format_policy(format_policy)
+        except ValueError as e:
+            QMessageBox.warning(self, "خطا", str(e))
+            return
+
+        self.batch_command_options = {
+            "save_path": self.get_save_path(),
+            "browser": self.browser_select.currentText().lower(),
+            "engine": self.engine_select.currentData(),
+            "postprocess": self.postprocess_steps(),
+            "format_policy": format_policy,
+            **self.transfer_options(),
+        }
+
+        if urls != self.probed_urls:
+            self.reset_batch_table(urls)
+        format_specs = []
+        for row in range(len(urls)):
+            choice = self.selected_choice(row)
+            format_specs.append(choice[1] if choice else None)
+
+        collections = [url for url in urls if is_collection_url(url)]
+        if collections:
+            format_specs = [spec for url, spec in zip(urls, format_specs) if not is_collection_url(url)]
+            urls = [url for url in urls if not is_collection_url(url)]
+            self.reset_batch_table(urls)
+        for row in range(len(urls)):
+            self.batch_table.item(row, COL_STATUS).setText(ITEM_STATUS_LABELS[ITEM_QUEUED])
+            self.batch_table.item(row, COL_PROGRESS).setText("0%")
+
+        self.log(f"\n{'='*50}\nشروع دانلود دسته‌ای {len(urls)} لینک با {self.workers_spin.value()} دانلود همزمان\n{'='*50}")
+        if collections:
+            self.log(f"{len(collections)} پلی‌لیست/کانال در حین دانلود فهرست و به صف اضافه می‌شوند.")
+        self.log(self.metadata_cache.stats_text())
+        self.log(self.download_index.stats_text())
+
+        def start():
+            self.batch_scheduler.hold()
+            self.batch_scheduler.start(urls, format_specs, self.batch_command_options)
+            if collections:
+                self.collection_expander = CollectionExpander(
+                    self.batch_scheduler, self.batch_command_options["browser"], playlist_filter,
+                    on_message=self.log,
+                )
+                self.collection_expander.start(collections)
+            self.batch_scheduler.release()
+        self.run_batch(start)
+
+    def run_batch(self, start):
+        if not self.apply_bandwidth_settings():
+            return
+        self.set_buttons_enabled(False)
+        self.stop_batch_btn.setEnabled(True)
+        self.retry_failed_btn.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.batch_scheduler.engine_name = self.batch_command_options["engine"]
+        self.batch_scheduler.set_max_workers(self.workers_spin.value())
+        if self.batch_scheduler.postprocessor is not None:
+            self.batch_scheduler.postprocessor.shutdown()
+        steps = self.batch_command_options["postprocess"]
+        self.batch_scheduler.postprocessor = PostProcessor(steps) if steps else None
+        start()
+
+    def offer_resume(self):
+        pending = self.queue_store.pending_count()
+        if not pending:
+            return
+        answer = QMessageBox.question(
+            self, "ادامه دانلود",
+            f"{pending} مورد از دانلود دسته‌ای قبلی کامل نشده است.\nآیا می‌خواهید دانلود را از همان‌جا ادامه دهید؟"
+        )
+        if answer != QMessageBox.StandardButton.Yes:
+            self.queue_store.clear()
+            return
+
+        items, options = self.queue_store.load()
+        self.batch_command_options = {
+            "save_path": options.get("save_path") or self.get_save_path(),
+            "browser": options.get("browser") or self.browser_select.currentText().lower(),
+            "engine": options.get("engine") or self.engine_select.currentData(),
+            "postprocess": options.get("postprocess", self.postprocess_steps()),
+            "format_policy": options.get("format_policy", ""),
+            **self.transfer_options(),
+        }
+        for key in ("concurrent_fragments", "external_downloader"):
+            if key in options:
+                self.batch_command_options[key] = options[key]
+        if not self.aria2c_check.isEnabled():
+            self.batch_command_options["external_downloader"] = None
+        if not shutil.which("ffmpeg"):
+            self.batch_command_options["postprocess"] = []
+        self.url_input.setPlainText("\n".join(item.url for item in items))
+        self.reset_batch_table([item.url for item in items])
+        for row, item in enumerate(items):
+            status = item.status if item.status in (ITEM_DONE, ITEM_FILTERED) else ITEM_QUEUED
+            self.batch_table.item(row, COL_STATUS).setText(ITEM_STATUS_LABELS[status])
+            self.batch_table.item(row, COL_PROGRESS).setText("0%" if status == ITEM_QUEUED else "100%")
+
+        self.log(f"\n{'='*50}\nادامه دانلود دسته‌ای: {pending} مورد باقی‌مانده از {len(items)}\n{'='*50}")
+        self.run_batch(lambda: self.batch_scheduler.start_items(items, self.batch_command_options))
+
+    def build_batch_job(self, item):
+        options = self.batch_command_options
+        return DownloadJob(
+            item.url, item.format_spec or parse_format_policy(options["format_policy"]).selector(), options["save_path"], options["browser"],
+            download_archive=self.download_archive_path,
+            concurrent_fragments=options["concurrent_fragments"],
+            external_downloader=options["external_downloader"],
+            write_thumbnail=POSTPROCESS_THUMBNAIL in options["postprocess"],
+        )
+
+    def stop_batch_download(self):
+        self.stop_batch_btn.setEnabled(False)
+        self.log("\nدر حال توقف دانلود دسته‌ای...")
+        if self.collection_expander is not None:
+            self.collection_expander.stop()
+        self.batch_scheduler.stop()
+
+    def on_batch_item_changed(self, index):
+        item = self.batch_scheduler.items[index]
+        if index >= self.batch_table.rowCount():
+            self.batch_table.setRowCount(index + 1)
+            self.fill_batch_row(index, item.url, item.title)
+        status_item = self.batch_table.item(index, COL_STATUS)
+        if item.status in (ITEM_FAILED, ITEM_WAITING) and item.failure:
+            status_item.setText(f"{ITEM_STATUS_LABELS[item.status]} ({FAILURE_LABELS[item.failure]})")
+        else:
+            status_item.setText(ITEM_STATUS_LABELS[item.status])
+        status_item.setToolTip(item.error)
+        self.batch_table.item(index, COL_PROGRESS).setText(f"{item.progress}%")
+        if item.status == ITEM_RUNNING and item.speed:
+            self.batch_table.item(index, COL_SPEED).setText(f"{format_size(item.speed)}/s | {format_eta(item.eta)}")
+        elif item.status != ITEM_RUNNING:
+            self.batch_table.item(index, COL_SPEED).setText("")
+        if item.status != ITEM_RUNNING:
+            self.update_batch_status()
+
+    def log_batch_report(self):
+        jobs, report_summary = self.batch_scheduler.report()
+        self.log(report_summary_text(report_summary))
+        try:
+            json_path, csv_path = save_batch_report(jobs, report_summary)
+        except OSError as e:
+            self.log(f"خطا در ذخیره گزارش عملکرد: {e}")
+            return
+        self.log(f"گزارش کامل هر دانلود ذخیره شد:\n{json_path}\n{csv_path}")
+
+    def retry_failed_downloads(self):
+        self.log(f"\n{'='*50}\nتلاش دوباره برای {self.batch_scheduler.counts()[ITEM_FAILED]} مورد ناموفق\n{'='*50}")
+        self.run_batch(self.batch_scheduler.retry_failed)
+
+    def log_batch_message(self, index, message):
+        self.log_download_message(f"[{index + 1}] {message}")
+
+    def on_batch_progress(self, value):
+        self.progress_bar.setValue(value)
+
+    def update_batch_status(self):
+        counts = self.batch_scheduler.counts()
+        self.batch_status_label.setText(
+            f"انجام شد: {counts[ITEM_DONE]} | خارج از بازه تاریخ: {counts[ITEM_FILTERED]} | ناموفق: {counts[ITEM_FAILED]} | "
+            f"در حال دانلود: {counts[ITEM_RUNNING]} | در حال پردازش: {counts[ITEM_POSTPROCESSING]} | "
+            f"در صف: {counts[ITEM_QUEUED]} | در انتظار تلاش دوباره: {counts[ITEM_WAITING]}"
+        )
+
+    def on_batch_finished(self):
+        self.update_batch_status()
+        self.stop_batch_btn.setEnabled(False)
+        self.set_buttons_enabled(True)
+        counts = self.batch_scheduler.counts()
+        summary = (
+            f"موفق: {counts[ITEM_DONE]} (از قبل دانلود شده: {self.batch_scheduler.skipped}) | "
+            f"خارج از بازه تاریخ: {counts[ITEM_FILTERED]} | ناموفق: {counts[ITEM_FAILED]} | "
+            f"باقی‌مانده در صف: {counts[ITEM_QUEUED]}"
+        )
+        failures = {}
+        for item in self.batch_scheduler.items:
+            if item.status == ITEM_FAILED:
+                label = FAILURE_LABELS.get(item.failure, FAILURE_LABELS[FAILURE_OTHER])
+                failures[label] = failures.get(label, 0) + 1
+        if failures:
+            summary += "\n" + " | ".join(f"{label}: {count}" for label, count in failures.items())
+        self.retry_failed_btn.setEnabled(bool(counts[ITEM_FAILED]))
+        self.log(f"\nعملیات دانلود دسته‌ای به پایان رسید.\n{summary}")
+        self.log_batch_report()
+        QMessageBox.information(self, "پایان دانلود", f"دانلود دسته‌ای به پایان رسید.\n\n{summary}")
+
+    def select_file_for_audio_extraction(self):
+        video_files, _ = QFileDialog.getOpenFileNames(self, 'فایل‌های ویدیویی را برای استخراج صدا انتخاب کنید', '', 'Video Files (*.mp4 *.mkv *.webm *.avi *.mov)')
+        if video_files:
+            self.extract_audio_from_files(video_files)
+
+    def select_folder_for_audio_extraction(self):
+        folder = QFileDialog.getExistingDirectory(self, 'پوشه ویدیوها را برای استخراج صدا انتخاب کنید')
+        if not folder:
+            return
+        video_files = find_video_files(folder)
+        if not video_files:
+            QMessageBox.warning(self, "هشدار", "هیچ فایل ویدیویی در این پوشه یافت نشد.")
+            return
+        self.extract_audio_from_files(video_files)
+
+    def extract_audio_from_files(self, video_files):
+        self.reset_batch_table([os.path.basename(video_file) for video_file in video_files], use_cache=False)
+        for row, video_file in enumerate(video_files):
+            self.batch_table.item(row, COL_TITLE).setToolTip(video_file)
+            self.batch_table.item(row, COL_STATUS).setText(ITEM_STATUS_LABELS[ITEM_QUEUED])
+            self.batch_table.item(row, COL_PROGRESS).setText("0%")
+
+        self.extract_progress = [0] * len(video_files)
+        self.extract_results = {}
+        workers = os.cpu_count() or 1
+        self.set_log_text(f'در حال استخراج صدا از {len(video_files)} فایل با {workers} پردازش همزمان...')
+        self.set_buttons_enabled(False)
+        self.progress_bar.setValue(0)
+
+        self.extract_thread = ExtractAudioThread(video_files, self.force_mp3_check.isChecked(), workers)
+        self.extract_thread.planned.connect(self.on_extract_audio_planned)
+        self.extract_thread.progress.connect(self.on_extract_audio_progress)
+        self.extract_thread.file_finished.connect(self.on_extract_audio_file_finished)
+        self.extract_thread.error.connect(self.on_extract_audio_error)
+        self.extract_thread.finished.connect(self.on_extract_audio_finished)
+        self.extract_thread.start()
+
+    def on_extract_audio_planned(self, row, label):
+        self.batch_table.item(row, COL_QUALITY).setText(label)
+        self.batch_table.item(row, COL_STATUS).setText("در حال استخراج")
+
+    def on_extract_audio_progress(self, row, percent):
+        self.extract_progress[row] = percent
+        self.batch_table.item(row, COL_PROGRESS).setText(f"{percent}%")
+        self.progress_bar.setValue(sum(self.extract_progress) // len(self.extract_progress))
+
+    def on_extract_audio_file_finished(self, row, audio_file):
+        self.extract_results[row] = True
+        self.batch_table.item(row, COL_STATUS).setText(ITEM_STATUS_LABELS[ITEM_DONE])
+        self.log(f"[{row + 1}] صدا با موفقیت استخراج شد: {audio_file}")
+
+    def on_extract_audio_error(self, row, error_message):
+        self.extract_results[row] = False
+        self.extract_progress[row] = 100
+        status_item = self.batch_table.item(row, COL_STATUS)
+        status_item.setText(ITEM_STATUS_LABELS[ITEM_FAILED])
+        status_item.setToolTip(error_message)
+        self.log(f"\n[{row + 1}] خطا: {error_message}")
+
+    def on_extract_audio_finished(self):
+        self.set_buttons_enabled(True)
+        self.progress_bar.setValue(100)
+        succeeded = sum(1 for ok in self.extract_results.values() if ok)
+        failed = len(self.extract_progress) - succeeded
+        message = f"استخراج صدا به پایان رسید.\nموفق: {succeeded} | ناموفق: {failed}"
+        self.log(f"\n{message}")
+        if failed:
+            QMessageBox.critical(self, "خطا در استخراج", message)
+        else:
+            QMessageBox.information(self, "عملیات موفق", message)
+
+    def start_download(self, job):
+        self.progress_bar.setValue(0)
+        self.set_buttons_enabled(False)
+            
+        self.download_thread = DownloadThread(job, self.engine_select.currentData(), on_message=self.log_download_message)
+        self.download_thread.progress.connect(self.progress_bar.setValue)
+        self.download_thread.output_path.connect(self.on_download_output_path)
+        self.download_thread.finished_signal.connect(self.on_single_download_finished)
+        self.download_thread.start()
+
+    def log_download_message(self, message):
+        self.log(message)
+        if "ERROR" in message:
+            self.log(f"!!!!!!!! خطای جدی: {message} !!!!!!!!")
+
+    def on_download_output_path(self, path):
+        self.downloaded_file = path
+
+    def on_single_download_finished(self, success):
+        self.set_buttons_enabled(True)
+        if success:
+            QMessageBox.information(self, "دانلود کامل شد", f"فایل با موفقیت دانلود شد!\n\nمسیر: {self.downloaded_file}")
+
+    def get_save_path(self):
+        if self.custom_path:
+            return os.path.join(self.custom_path, "%(title)s.%(ext)s")
+        else:
+            return default_save_path()
+            
+    def set_buttons_enabled(self, enabled):
+        self.download_btn.setEnabled(enabled)
+        self.download_batch_btn.setEnabled(enabled)
+        self.probe_all_btn.setEnabled(enabled)
+        self.get_formats_btn.setEnabled(enabled)
+        self.download_audio_btn.setEnabled(enabled)
+        self.extract_folder_btn.setEnabled(enabled)
+
+def main():
+    app = QApplication(sys.argv)
+    app.setStyleSheet(STYLESHEET) 
+    window = YouTubeDownloader()
+    window.show()
+    exit_code = app.exec()
+    window.thumbnail_loader.shutdown()
+    window.log_buffer.close()
+    close_shared_cookies()
+    return exit_code
+
+if __name__ == '__main__':
+    sys.exit(main())